@@ -1,65 +1,193 @@
 import os
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncContextManager, AsyncGenerator, Callable, Final
+from uuid import UUID
 
 import aiosqlite
-from fastapi import Depends
+from fastapi import FastAPI, Request
+
+from app.db_pool import AioSqlitePool
 
 DATABASE_URL = "sqlite:///./timesheet.db"
 DATABASE_FILE = "./timesheet.db"
+DATABASE_READERS = int(os.getenv("DATABASE_READERS", "4"))
+
+ReaderFactory = Callable[[], AsyncContextManager[aiosqlite.Connection]]
+
+# Applied to every pooled connection when it is opened. journal_mode is
+# persisted in the database file, so it is set once at startup instead.
+CONNECTION_PRAGMAS = """
+PRAGMA foreign_keys=ON;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+"""
+
+# UUIDs are stored as 16-byte BLOBs rather than 36-character strings
+CREATE_EMPLOYEES_TABLE: Final[str] = """
+    CREATE TABLE IF NOT EXISTS employees (
+        uuid BLOB PRIMARY KEY,
+        staff_code TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL
+    )
+"""
+
+CREATE_TIMESHEETS_TABLE: Final[str] = """
+    CREATE TABLE IF NOT EXISTS timesheets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_uuid BLOB NOT NULL,
+        year INTEGER NOT NULL CHECK (year BETWEEN 2000 AND 2100),
+        month INTEGER NOT NULL CHECK (month BETWEEN 1 AND 12),
+        total_working_days INTEGER NOT NULL CHECK (total_working_days >= 0),
+        total_ot_hours REAL NOT NULL CHECK (total_ot_hours >= 0),
+        total_sundays_worked INTEGER NOT NULL CHECK (total_sundays_worked >= 0),
+        total_ot_hours_on_sundays REAL NOT NULL CHECK (total_ot_hours_on_sundays >= 0),
+        FOREIGN KEY (employee_uuid) REFERENCES employees (uuid) ON DELETE CASCADE,
+        UNIQUE (employee_uuid, year, month)
+    )
+"""
+
+
+def _uuid_text_to_blob(value: str) -> bytes:
+    """SQL function used by the migration to convert a TEXT uuid to bytes."""
+    return UUID(value).bytes
 
 
-async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
+async def _migrate_text_uuids(conn: aiosqlite.Connection) -> None:
     """
-    Create and yield a database connection.
+    Convert tables that still store uuids as TEXT to the BLOB schema.
+
+    The old tables are renamed aside, recreated with the current DDL, copied
+    across and dropped, all within a single transaction. Does nothing for new
+    databases or ones that have already been migrated.
+
+    Args:
+        conn: Database connection
     """
-    conn = await aiosqlite.connect(DATABASE_FILE)
-    conn.row_factory = aiosqlite.Row
+    async with conn.execute(
+        "SELECT type FROM pragma_table_info('employees') WHERE name = 'uuid'"
+    ) as cursor:
+        row = await cursor.fetchone()
+    if row is None or row[0].upper() != "TEXT":
+        return
+
+    await conn.create_function(
+        "uuid_text_to_blob", 1, _uuid_text_to_blob, deterministic=True
+    )
+
+    await conn.execute("BEGIN")
     try:
+        await conn.execute("ALTER TABLE timesheets RENAME TO timesheets_text")
+        await conn.execute("ALTER TABLE employees RENAME TO employees_text")
+        await conn.execute("DROP INDEX IF EXISTS idx_timesheets_employee_period")
+
+        await conn.execute(CREATE_EMPLOYEES_TABLE)
+        await conn.execute(CREATE_TIMESHEETS_TABLE)
+
+        await conn.execute(
+            """
+            INSERT INTO employees (uuid, staff_code, name)
+            SELECT uuid_text_to_blob(uuid), staff_code, name FROM employees_text
+            """
+        )
+        await conn.execute(
+            """
+            INSERT INTO timesheets (
+                id, employee_uuid, year, month, total_working_days, total_ot_hours,
+                total_sundays_worked, total_ot_hours_on_sundays
+            )
+            SELECT
+                id, uuid_text_to_blob(employee_uuid), year, month,
+                total_working_days, total_ot_hours, total_sundays_worked,
+                total_ot_hours_on_sundays
+            FROM timesheets_text
+            """
+        )
+
+        await conn.execute("DROP TABLE timesheets_text")
+        await conn.execute("DROP TABLE employees_text")
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+
+
+async def get_reader(request: Request) -> AsyncGenerator[aiosqlite.Connection, None]:
+    """
+    Borrow a reader connection from the pool for read-only endpoints.
+    """
+    async with request.app.state.db_pool.reader() as conn:
         yield conn
-    finally:
-        await conn.close()
 
 
-@asynccontextmanager
-async def lifespan(app):
+async def get_reader_factory(request: Request) -> ReaderFactory:
+    """
+    Return a function that borrows a reader connection from the pool, for
+    endpoints that only need one on a cache miss.
+    """
+    return request.app.state.db_pool.reader
+
+
+async def get_writer(request: Request) -> AsyncGenerator[aiosqlite.Connection, None]:
     """
-    Lifecycle manager for the application.
-    Creates database tables if they don't exist.
+    Borrow the single writer connection for endpoints that modify data.
+    """
+    async with request.app.state.db_pool.writer() as conn:
+        yield conn
+
+
+async def open_database(app: FastAPI) -> None:
+    """
+    Prepare the database and open the connection pool used by all requests.
+
+    Creates tables if they don't exist, migrates old databases and refreshes
+    planner statistics before the pool is attached to app.state.
     """
     # Create tables on startup
     async with aiosqlite.connect(DATABASE_FILE) as conn:
+        # WAL lets readers proceed while the writer commits
+        await conn.execute("PRAGMA journal_mode=WAL")
+
+        # Rewrite databases created before uuids were stored as BLOBs
+        await _migrate_text_uuids(conn)
+
         # Create Employee table
-        await conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS employees (
-                uuid TEXT PRIMARY KEY,
-                staff_code TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL
-            )
-            """
-        )
+        await conn.execute(CREATE_EMPLOYEES_TABLE)
 
         # Create Timesheet table
+        await conn.execute(CREATE_TIMESHEETS_TABLE)
+
+        # Covering index so listing an employee's timesheets is answered from
+        # the index in ORDER BY order, without a sort or table lookups
         await conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS timesheets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_uuid TEXT NOT NULL,
-                year INTEGER NOT NULL CHECK (year BETWEEN 2000 AND 2100),
-                month INTEGER NOT NULL CHECK (month BETWEEN 1 AND 12),
-                total_working_days INTEGER NOT NULL CHECK (total_working_days >= 0),
-                total_ot_hours REAL NOT NULL CHECK (total_ot_hours >= 0),
-                total_sundays_worked INTEGER NOT NULL CHECK (total_sundays_worked >= 0),
-                total_ot_hours_on_sundays REAL NOT NULL CHECK (total_ot_hours_on_sundays >= 0),
-                FOREIGN KEY (employee_uuid) REFERENCES employees (uuid) ON DELETE CASCADE,
-                UNIQUE (employee_uuid, year, month)
+            CREATE INDEX IF NOT EXISTS idx_timesheets_employee_period
+            ON timesheets (
+                employee_uuid, year DESC, month DESC, total_working_days,
+                total_ot_hours, total_sundays_worked, total_ot_hours_on_sundays
             )
             """
         )
 
+        # Gather planner statistics for the indexes above on first startup;
+        # afterwards only refresh them when SQLite judges them stale
+        async with conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ) as cursor:
+            has_stats = await cursor.fetchone() is not None
+        await conn.execute("PRAGMA optimize" if has_stats else "ANALYZE")
+
         await conn.commit()
 
-    yield
+    # Open the connection pool for the lifetime of the application
+    app.state.db_pool = AioSqlitePool(
+        DATABASE_FILE, readers=DATABASE_READERS, pragmas=CONNECTION_PRAGMAS
+    )
+    await app.state.db_pool.open()
 
-    # No cleanup needed for SQLite
+
+async def close_database(app: FastAPI) -> None:
+    """
+    Close the connection pool opened by open_database().
+    """
+    await app.state.db_pool.close()
@@ -0,0 +1,92 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+import aiosqlite
+
+# Compiled statements kept per connection. The repositories issue a fixed set
+# of SQL constants (about 30, counting every UPDATE column combination), so
+# with room to spare none of them is ever parsed and planned a second time.
+STATEMENT_CACHE_SIZE = 256
+
+
+class AioSqlitePool:
+    """Pool of one writer connection and a fixed number of read-only connections."""
+
+    def __init__(self, database: str, readers: int = 4, pragmas: str = ""):
+        """Initialize the pool.
+
+        Args:
+            database: Path to the SQLite database file
+            readers: Number of reader connections to keep open
+            pragmas: PRAGMA script applied to every connection when opened
+        """
+        self.database = database
+        self.reader_count = readers
+        self.pragmas = pragmas
+        self.readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue(
+            maxsize=readers
+        )
+        self.writer_conn: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def _connect(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open an autocommit connection with row factory and pragmas applied.
+
+        Args:
+            read_only: Open the database with mode=ro so the connection can
+                never take the write lock
+        """
+        database = self.database
+        if read_only:
+            database = f"{Path(self.database).resolve().as_uri()}?mode=ro"
+
+        # Single statements commit on their own; multi-statement writes open
+        # an explicit transaction with BEGIN
+        conn = await aiosqlite.connect(
+            database,
+            isolation_level=None,
+            uri=read_only,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = aiosqlite.Row
+        if self.pragmas:
+            await conn.executescript(self.pragmas)
+        self._connections.append(conn)
+        return conn
+
+    async def open(self) -> None:
+        """Open the writer and all reader connections."""
+        # The writer goes first so WAL mode is set before readers attach
+        self.writer_conn = await self._connect()
+        for _ in range(self.reader_count):
+            self.readers.put_nowait(await self._connect(read_only=True))
+
+    async def close(self) -> None:
+        """Close every connection owned by the pool."""
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self.writer_conn = None
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a reader connection, waiting if all are in use."""
+        conn = await self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow the writer connection exclusively."""
+        async with self._writer_lock:
+            try:
+                yield self.writer_conn
+            finally:
+                # Never leak an uncommitted transaction to the next borrower
+                if self.writer_conn.in_transaction:
+                    await self.writer_conn.rollback()
@@ -0,0 +1,30 @@
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.database import close_database, open_database
+from app.services.executors import create_ocr_pool
+from app.services.llm.client import close_llm_http_client, open_llm_http_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifecycle manager for the application.
+    Opens the database and its connection pool, the OCR process pool and the
+    HTTP client shared by LLM requests, for as long as the application runs.
+    """
+    await open_database(app)
+
+    # Process pool that keeps PDF parsing off the event loop
+    app.state.ocr_pool = create_ocr_pool()
+
+    # Keep-alive HTTP connections shared by every LLM request
+    llm_http_client = open_llm_http_client()
+
+    try:
+        yield
+    finally:
+        await close_llm_http_client(llm_http_client)
+        app.state.ocr_pool.shutdown(cancel_futures=True)
+        await close_database(app)
@@ -1,13 +1,20 @@
 import logging
-from typing import List
+import os
+from typing import Dict, List
 
+from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
-from app.database import lifespan
-from app.routers import employee_routes, timesheet_routes, ocr_routes
+# Load .env before the app modules read their settings at import time
+load_dotenv()
 
-# Configure logging
+from app.lifespan import lifespan  # noqa: E402
+from app.middleware import PDFUploadMiddleware  # noqa: E402
+from app.routers import employee_routes, timesheet_routes, ocr_routes  # noqa: E402
+
+# Configure logging once for the whole application
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -19,6 +26,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Reject non-PDF uploads before the multipart body is parsed
+app.add_middleware(PDFUploadMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +38,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses, such as the employee and timesheet lists
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(employee_routes.router)
 app.include_router(timesheet_routes.router)
@@ -36,13 +49,13 @@ app.include_router(ocr_routes.router)
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+async def health_check() -> Dict[str, str]:
     """Health check endpoint."""
     return {"status": "ok"}
 
 
 @app.get("/")
-async def root():
+async def root() -> Dict[str, str]:
     """
     Root endpoint redirecting to the health check documentation.
     """
@@ -52,4 +65,8 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # Auto-reload is a development convenience; keep it off unless asked for
+    reload = os.getenv("APP_RELOAD", "false").lower() == "true"
+    # "auto" runs on uvloop, installed with uvicorn[standard], and falls back
+    # to the asyncio loop where uvloop is unavailable (e.g. Windows)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=reload, loop="auto")
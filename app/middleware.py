@@ -0,0 +1,98 @@
+import re
+from typing import List, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PDF_UPLOAD_PATH = "/ocr/pdf"
+PDF_CONTENT_TYPE = b"application/pdf"
+
+# How much of the request body is inspected for the file part headers
+PEEK_BYTES = 4096
+
+_BOUNDARY_PATTERN = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_FILE_FIELD_PATTERN = re.compile(rb';\s*name="file"')
+_PART_CONTENT_TYPE_PATTERN = re.compile(
+    rb"^content-type:\s*([^\r\n;]+)", re.IGNORECASE | re.MULTILINE
+)
+
+
+def _file_part_content_type(body: bytes, boundary: bytes) -> Optional[bytes]:
+    """
+    Find the Content-Type of the "file" part in the start of a multipart body.
+
+    Args:
+        body: Leading bytes of the multipart body
+        boundary: Multipart boundary from the request Content-Type header
+
+    Returns:
+        The part's content type, b"" if the part has none, or None if the part
+        headers are not within the inspected bytes
+    """
+    for part in body.split(b"--" + boundary):
+        headers, separator, _ = part.partition(b"\r\n\r\n")
+        if not separator or not _FILE_FIELD_PATTERN.search(headers):
+            continue
+        match = _PART_CONTENT_TYPE_PATTERN.search(headers)
+        return match.group(1).strip() if match else b""
+    return None
+
+
+class PDFUploadMiddleware:
+    """Reject non-PDF uploads to the OCR endpoint before the body is parsed.
+
+    The headers of the multipart "file" part normally sit in the first few
+    bytes of the body, so they are checked before Starlette spools the upload.
+    Requests that cannot be decided from the first PEEK_BYTES are passed on
+    unchanged and left to the route's own content type check.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != PDF_UPLOAD_PATH
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        content_type = dict(scope["headers"]).get(b"content-type", b"").decode()
+        boundary = _BOUNDARY_PATTERN.search(content_type)
+        if not content_type.startswith("multipart/form-data") or not boundary:
+            await self.app(scope, receive, send)
+            return
+
+        # Read just enough of the body to see the file part headers
+        buffered: List[Message] = []
+        body = b""
+        while len(body) < PEEK_BYTES:
+            message = await receive()
+            buffered.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        file_content_type = _file_part_content_type(
+            body[:PEEK_BYTES], boundary.group(1).encode()
+        )
+        if file_content_type is not None and file_content_type != PDF_CONTENT_TYPE:
+            response = JSONResponse(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                content={"detail": "File must be a PDF"},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def replay() -> Message:
+            # Hand the already-read messages to the app before reading more
+            if buffered:
+                return buffered.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
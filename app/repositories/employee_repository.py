@@ -1,10 +1,48 @@
-from typing import Dict, List, Optional
+from itertools import combinations
+from typing import Dict, Final, FrozenSet, List, Optional, Tuple
 from uuid import UUID, uuid4
 
 import aiosqlite
 
 from app.schemas.employee import EmployeeCreate, EmployeeUpdate
 
+SELECT_EMPLOYEES: Final[str] = "SELECT uuid, staff_code, name FROM employees"
+
+SELECT_EMPLOYEE_BY_UUID: Final[str] = (
+    "SELECT uuid, staff_code, name FROM employees WHERE uuid = ?"
+)
+
+EMPLOYEE_EXISTS: Final[str] = "SELECT 1 FROM employees WHERE uuid = ? LIMIT 1"
+
+# Skips the insert instead of failing when the staff code is taken; the
+# caller sees that as no row being returned
+INSERT_EMPLOYEE: Final[str] = (
+    "INSERT INTO employees (uuid, staff_code, name) VALUES (?, ?, ?) "
+    "ON CONFLICT (staff_code) DO NOTHING RETURNING uuid"
+)
+
+DELETE_EMPLOYEE: Final[str] = "DELETE FROM employees WHERE uuid = ?"
+
+UPDATABLE_EMPLOYEE_COLUMNS: Final[Tuple[str, ...]] = ("staff_code", "name")
+
+# One UPDATE per combination of columns, built once so every call with the
+# same fields reuses the same statement text
+UPDATE_EMPLOYEE: Final[Dict[FrozenSet[str], str]] = {
+    frozenset(columns): (
+        f"UPDATE employees SET {', '.join(f'{column} = ?' for column in columns)} "
+        "WHERE uuid = ? RETURNING uuid, staff_code, name"
+    )
+    for size in range(1, len(UPDATABLE_EMPLOYEE_COLUMNS) + 1)
+    for columns in combinations(UPDATABLE_EMPLOYEE_COLUMNS, size)
+}
+
+
+def _employee_from_row(row: aiosqlite.Row) -> Dict:
+    """Convert an employee row into a dict, decoding the 16-byte BLOB uuid."""
+    employee = dict(row)
+    employee["uuid"] = UUID(bytes=employee["uuid"])
+    return employee
+
 
 async def get_employees(conn: aiosqlite.Connection) -> List[Dict]:
     """
@@ -16,9 +54,9 @@ async def get_employees(conn: aiosqlite.Connection) -> List[Dict]:
     Returns:
         List of employee records
     """
-    async with conn.execute("SELECT uuid, staff_code, name FROM employees") as cursor:
+    async with conn.execute(SELECT_EMPLOYEES) as cursor:
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return [_employee_from_row(row) for row in rows]
 
 
 async def get_employee_by_uuid(
@@ -34,35 +72,29 @@ async def get_employee_by_uuid(
     Returns:
         Employee record or None if not found
     """
-    async with conn.execute(
-        "SELECT uuid, staff_code, name FROM employees WHERE uuid = ?", (str(uuid),)
-    ) as cursor:
+    async with conn.execute(SELECT_EMPLOYEE_BY_UUID, (uuid.bytes,)) as cursor:
         row = await cursor.fetchone()
-        return dict(row) if row else None
+        return _employee_from_row(row) if row else None
 
 
-async def get_employee_by_staff_code(
-    conn: aiosqlite.Connection, staff_code: str
-) -> Optional[Dict]:
+async def employee_exists(conn: aiosqlite.Connection, uuid: UUID) -> bool:
     """
-    Get employee by staff code.
+    Check whether an employee exists without fetching its columns.
 
     Args:
         conn: Database connection
-        staff_code: Employee staff code
+        uuid: Employee UUID
 
     Returns:
-        Employee record or None if not found
+        True if the employee exists, False otherwise
     """
-    async with conn.execute(
-        "SELECT uuid, staff_code, name FROM employees WHERE staff_code = ?",
-        (staff_code,),
-    ) as cursor:
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+    async with conn.execute(EMPLOYEE_EXISTS, (uuid.bytes,)) as cursor:
+        return await cursor.fetchone() is not None
 
 
-async def create_employee(conn: aiosqlite.Connection, employee: EmployeeCreate) -> Dict:
+async def create_employee(
+    conn: aiosqlite.Connection, employee: EmployeeCreate
+) -> Optional[Dict]:
     """
     Create a new employee.
 
@@ -71,15 +103,15 @@ async def create_employee(conn: aiosqlite.Connection, employee: EmployeeCreate)
         employee: Employee data
 
     Returns:
-        Created employee record
+        Created employee record or None if the staff code already exists
     """
-    employee_uuid = str(uuid4())
+    employee_uuid = uuid4()
 
-    await conn.execute(
-        "INSERT INTO employees (uuid, staff_code, name) VALUES (?, ?, ?)",
-        (employee_uuid, employee.staff_code, employee.name),
+    rows = await conn.execute_fetchall(
+        INSERT_EMPLOYEE, (employee_uuid.bytes, employee.staff_code, employee.name)
     )
-    await conn.commit()
+    if not rows:
+        return None
 
     return {
         "uuid": employee_uuid,
@@ -102,11 +134,6 @@ async def update_employee(
     Returns:
         Updated employee record or None if not found
     """
-    # Get current employee data
-    current_employee = await get_employee_by_uuid(conn, uuid)
-    if not current_employee:
-        return None
-
     # Prepare update values
     updates = {}
     if employee.staff_code is not None:
@@ -115,18 +142,18 @@ async def update_employee(
         updates["name"] = employee.name
 
     if not updates:
-        return current_employee
+        return await get_employee_by_uuid(conn, uuid)
 
-    # Build update query
-    set_clause = ", ".join(f"{key} = ?" for key in updates)
-    values = list(updates.values())
-    values.append(str(uuid))
+    # Bind values in the same column order the statement was built with
+    values = [
+        updates[column] for column in UPDATABLE_EMPLOYEE_COLUMNS if column in updates
+    ]
+    values.append(uuid.bytes)
 
-    await conn.execute(f"UPDATE employees SET {set_clause} WHERE uuid = ?", values)
-    await conn.commit()
+    # Update and read back the row in a single statement
+    rows = await conn.execute_fetchall(UPDATE_EMPLOYEE[frozenset(updates)], values)
 
-    # Return updated employee
-    return await get_employee_by_uuid(conn, uuid)
+    return _employee_from_row(rows[0]) if rows else None
 
 
 async def delete_employee(conn: aiosqlite.Connection, uuid: UUID) -> bool:
@@ -140,7 +167,6 @@ async def delete_employee(conn: aiosqlite.Connection, uuid: UUID) -> bool:
     Returns:
         True if employee was deleted, False if not found
     """
-    cursor = await conn.execute("DELETE FROM employees WHERE uuid = ?", (str(uuid),))
-    await conn.commit()
+    cursor = await conn.execute(DELETE_EMPLOYEE, (uuid.bytes,))
 
     return cursor.rowcount > 0
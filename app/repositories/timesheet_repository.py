@@ -1,10 +1,108 @@
-from typing import Dict, List, Optional, Tuple
+import json
+from itertools import combinations
+from typing import AsyncIterator, Dict, Final, FrozenSet, List, Optional, Tuple
 from uuid import UUID
 
 import aiosqlite
 
 from app.schemas.timesheet import TimesheetCreate, TimesheetUpdate
 
+TIMESHEET_COLUMNS: Final[str] = """
+    id, employee_uuid, year, month, total_working_days, total_ot_hours,
+    total_sundays_worked, total_ot_hours_on_sundays
+"""
+
+SELECT_TIMESHEETS_BY_EMPLOYEE: Final[str] = f"""
+    SELECT {TIMESHEET_COLUMNS}
+    FROM timesheets
+    WHERE employee_uuid = ?
+    ORDER BY year DESC, month DESC
+"""
+
+SELECT_TIMESHEET: Final[str] = f"""
+    SELECT {TIMESHEET_COLUMNS}
+    FROM timesheets
+    WHERE employee_uuid = ? AND year = ? AND month = ?
+"""
+
+# Reads back the months in a JSON array of [year, month] pairs, in array order
+SELECT_TIMESHEETS_BY_PERIODS: Final[str] = f"""
+    SELECT {TIMESHEET_COLUMNS}
+    FROM (
+        SELECT
+            key AS position,
+            json_extract(value, '$[0]') AS period_year,
+            json_extract(value, '$[1]') AS period_month
+        FROM json_each(?)
+    )
+    JOIN timesheets
+        ON employee_uuid = ? AND year = period_year AND month = period_month
+    ORDER BY position
+"""
+
+INSERT_TIMESHEET: Final[str] = """
+    INSERT INTO timesheets (
+        employee_uuid, year, month, total_working_days, total_ot_hours,
+        total_sundays_worked, total_ot_hours_on_sundays
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Skips the insert instead of failing when the employee already has a
+# timesheet for the month; the caller sees that as no row being returned
+INSERT_TIMESHEET_RETURNING: Final[str] = (
+    f"{INSERT_TIMESHEET} ON CONFLICT (employee_uuid, year, month) DO NOTHING "
+    f"RETURNING {TIMESHEET_COLUMNS}"
+)
+
+DELETE_TIMESHEET: Final[str] = """
+    DELETE FROM timesheets
+    WHERE employee_uuid = ? AND year = ? AND month = ?
+"""
+
+UPDATABLE_TIMESHEET_COLUMNS: Final[Tuple[str, ...]] = (
+    "total_working_days",
+    "total_ot_hours",
+    "total_sundays_worked",
+    "total_ot_hours_on_sundays",
+)
+
+# One UPDATE per combination of columns, built once so every call with the
+# same fields reuses the same statement text
+UPDATE_TIMESHEET: Final[Dict[FrozenSet[str], str]] = {
+    frozenset(columns): f"""
+    UPDATE timesheets
+    SET {", ".join(f"{column} = ?" for column in columns)}
+    WHERE employee_uuid = ? AND year = ? AND month = ?
+    RETURNING {TIMESHEET_COLUMNS}
+"""
+    for size in range(1, len(UPDATABLE_TIMESHEET_COLUMNS) + 1)
+    for columns in combinations(UPDATABLE_TIMESHEET_COLUMNS, size)
+}
+
+
+def _timesheet_from_row(row: aiosqlite.Row, employee_uuid: UUID) -> Dict:
+    """Convert a timesheet row into a dict.
+
+    Every query filters on the employee, so the caller's UUID is reused rather
+    than decoding the BLOB column again for each row.
+    """
+    timesheet = dict(row)
+    timesheet["employee_uuid"] = employee_uuid
+    return timesheet
+
+
+def _timesheet_params(employee_uuid: UUID, timesheet: TimesheetCreate) -> Tuple:
+    """Build the INSERT_TIMESHEET parameters for a timesheet."""
+    return (
+        employee_uuid.bytes,
+        timesheet.year,
+        timesheet.month,
+        timesheet.total_working_days,
+        timesheet.total_ot_hours,
+        timesheet.total_sundays_worked,
+        timesheet.total_ot_hours_on_sundays,
+    )
+
 
 async def get_timesheets_by_employee(
     conn: aiosqlite.Connection, employee_uuid: UUID
@@ -20,17 +118,32 @@ async def get_timesheets_by_employee(
         List of timesheet records
     """
     async with conn.execute(
-        """
-        SELECT id, employee_uuid, year, month, total_working_days, total_ot_hours,
-               total_sundays_worked, total_ot_hours_on_sundays
-        FROM timesheets
-        WHERE employee_uuid = ?
-        ORDER BY year DESC, month DESC
-        """,
-        (str(employee_uuid),),
+        SELECT_TIMESHEETS_BY_EMPLOYEE, (employee_uuid.bytes,)
     ) as cursor:
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return [_timesheet_from_row(row, employee_uuid) for row in rows]
+
+
+async def iter_timesheets_by_employee(
+    conn: aiosqlite.Connection, employee_uuid: UUID
+) -> AsyncIterator[Dict]:
+    """
+    Iterate over an employee's timesheets without loading them all at once.
+
+    Rows are fetched from aiosqlite in chunks as the caller consumes them.
+
+    Args:
+        conn: Database connection
+        employee_uuid: Employee UUID
+
+    Yields:
+        Timesheet records, newest first
+    """
+    async with conn.execute(
+        SELECT_TIMESHEETS_BY_EMPLOYEE, (employee_uuid.bytes,)
+    ) as cursor:
+        async for row in cursor:
+            yield _timesheet_from_row(row, employee_uuid)
 
 
 async def get_timesheet(
@@ -49,21 +162,15 @@ async def get_timesheet(
         Timesheet record or None if not found
     """
     async with conn.execute(
-        """
-        SELECT id, employee_uuid, year, month, total_working_days, total_ot_hours,
-               total_sundays_worked, total_ot_hours_on_sundays
-        FROM timesheets
-        WHERE employee_uuid = ? AND year = ? AND month = ?
-        """,
-        (str(employee_uuid), year, month),
+        SELECT_TIMESHEET, (employee_uuid.bytes, year, month)
     ) as cursor:
         row = await cursor.fetchone()
-        return dict(row) if row else None
+        return _timesheet_from_row(row, employee_uuid) if row else None
 
 
 async def create_timesheet(
     conn: aiosqlite.Connection, employee_uuid: UUID, timesheet: TimesheetCreate
-) -> Dict:
+) -> Optional[Dict]:
     """
     Create a new timesheet.
 
@@ -73,29 +180,47 @@ async def create_timesheet(
         timesheet: Timesheet data
 
     Returns:
-        Created timesheet record
+        Created timesheet record or None if one already exists for the month
+    """
+    rows = await conn.execute_fetchall(
+        INSERT_TIMESHEET_RETURNING, _timesheet_params(employee_uuid, timesheet)
+    )
+
+    return _timesheet_from_row(rows[0], employee_uuid) if rows else None
+
+
+async def bulk_create_timesheets(
+    conn: aiosqlite.Connection, employee_uuid: UUID, items: List[TimesheetCreate]
+) -> List[Dict]:
+    """
+    Create several timesheets for an employee in one statement batch.
+
+    Args:
+        conn: Database connection
+        employee_uuid: Employee UUID
+        items: Timesheet data for each row to insert
+
+    Returns:
+        Created timesheet records, in the same order as items
+
+    Raises:
+        aiosqlite.IntegrityError: If any timesheet already exists
     """
-    cursor = await conn.execute(
-        """
-        INSERT INTO timesheets (
-            employee_uuid, year, month, total_working_days, total_ot_hours,
-            total_sundays_worked, total_ot_hours_on_sundays
-        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            str(employee_uuid),
-            timesheet.year,
-            timesheet.month,
-            timesheet.total_working_days,
-            timesheet.total_ot_hours,
-            timesheet.total_sundays_worked,
-            timesheet.total_ot_hours_on_sundays,
-        ),
+    # Connections run in autocommit mode, so group the rows into one
+    # transaction; the caller rolls back on IntegrityError
+    await conn.execute("BEGIN IMMEDIATE")
+    await conn.executemany(
+        INSERT_TIMESHEET, [_timesheet_params(employee_uuid, item) for item in items]
+    )
+    # executemany discards RETURNING rows, so read the new months back in the
+    # same transaction
+    periods = json.dumps([[item.year, item.month] for item in items])
+    rows = await conn.execute_fetchall(
+        SELECT_TIMESHEETS_BY_PERIODS, (periods, employee_uuid.bytes)
     )
     await conn.commit()
 
-    # Get the inserted record
-    return await get_timesheet(conn, employee_uuid, timesheet.year, timesheet.month)
+    return [_timesheet_from_row(row, employee_uuid) for row in rows]
 
 
 async def update_timesheet(
@@ -118,11 +243,6 @@ async def update_timesheet(
     Returns:
         Updated timesheet record or None if not found
     """
-    # Get current timesheet data
-    current_timesheet = await get_timesheet(conn, employee_uuid, year, month)
-    if not current_timesheet:
-        return None
-
     # Prepare update values
     updates = {}
     if timesheet.total_working_days is not None:
@@ -135,25 +255,18 @@ async def update_timesheet(
         updates["total_ot_hours_on_sundays"] = timesheet.total_ot_hours_on_sundays
 
     if not updates:
-        return current_timesheet
-
-    # Build update query
-    set_clause = ", ".join(f"{key} = ?" for key in updates)
-    values = list(updates.values())
-    values.extend([str(employee_uuid), year, month])
-
-    await conn.execute(
-        f"""
-        UPDATE timesheets
-        SET {set_clause}
-        WHERE employee_uuid = ? AND year = ? AND month = ?
-        """,
-        values,
-    )
-    await conn.commit()
+        return await get_timesheet(conn, employee_uuid, year, month)
+
+    # Bind values in the same column order the statement was built with
+    values = [
+        updates[column] for column in UPDATABLE_TIMESHEET_COLUMNS if column in updates
+    ]
+    values.extend([employee_uuid.bytes, year, month])
 
-    # Return updated timesheet
-    return await get_timesheet(conn, employee_uuid, year, month)
+    # Update and read back the row in a single statement
+    rows = await conn.execute_fetchall(UPDATE_TIMESHEET[frozenset(updates)], values)
+
+    return _timesheet_from_row(rows[0], employee_uuid) if rows else None
 
 
 async def delete_timesheet(
@@ -171,13 +284,6 @@ async def delete_timesheet(
     Returns:
         True if timesheet was deleted, False if not found
     """
-    cursor = await conn.execute(
-        """
-        DELETE FROM timesheets
-        WHERE employee_uuid = ? AND year = ? AND month = ?
-        """,
-        (str(employee_uuid), year, month),
-    )
-    await conn.commit()
+    cursor = await conn.execute(DELETE_TIMESHEET, (employee_uuid.bytes, year, month))
 
     return cursor.rowcount > 0
@@ -1,16 +1,59 @@
-from typing import List
+import hashlib
+from typing import Any, Hashable, List, Tuple
 from uuid import UUID
 
 import aiosqlite
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from pydantic import TypeAdapter
 
-from app.database import get_db
+from app.database import ReaderFactory, get_reader_factory, get_writer
 from app.schemas.employee import EmployeeCreate, EmployeeResponse, EmployeeUpdate
 from app.schemas.errors import ConflictErrorResponse, NotFoundErrorResponse
 from app.services import employee_service
+from app.services.cache import TTLCache
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
+# Serialized employee responses and their ETags. Cleared on every change made
+# through this process; the TTL bounds staleness across worker processes.
+employee_response_cache = TTLCache(maxsize=1024, ttl=60)
+
+EMPLOYEE_LIST_KEY = "employees"
+
+employee_list_adapter = TypeAdapter(List[EmployeeResponse])
+employee_adapter = TypeAdapter(EmployeeResponse)
+
+
+def _serialize(adapter: TypeAdapter, data: Any) -> Tuple[bytes, str]:
+    """Validate and dump data to JSON, returning the body and its weak ETag."""
+    body = adapter.dump_json(adapter.validate_python(data))
+    etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    return body, etag
+
+
+def _cached_response(
+    request: Request, key: Hashable, body: bytes, etag: str, generation: int
+) -> Response:
+    """
+    Cache a serialized body and answer 304 if the client already has it.
+
+    The body is only cached if the cache hasn't been cleared since generation
+    was taken: a write that committed meanwhile may have made it stale.
+    """
+    if employee_response_cache.generation == generation:
+        employee_response_cache.set(key, (body, etag))
+    return _conditional_response(request, body, etag)
+
+
+def _conditional_response(request: Request, body: bytes, etag: str) -> Response:
+    """Build a JSON response, or 304 Not Modified when If-None-Match matches."""
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 
 @router.get(
     "",
@@ -18,10 +61,19 @@ router = APIRouter(prefix="/employees", tags=["employees"])
     summary="List all employees",
     description="Retrieve a list of all employees in the system.",
 )
-async def get_employees(conn: aiosqlite.Connection = Depends(get_db)):
+async def get_employees(
+    request: Request, reader: ReaderFactory = Depends(get_reader_factory)
+):
     """Get all employees."""
-    employees = await employee_service.get_all_employees(conn)
-    return employees
+    cached = employee_response_cache.get(EMPLOYEE_LIST_KEY)
+    if cached is not None:
+        return _conditional_response(request, *cached)
+
+    generation = employee_response_cache.generation
+    async with reader() as conn:
+        employees = await employee_service.get_all_employees(conn)
+    body, etag = _serialize(employee_list_adapter, employees)
+    return _cached_response(request, EMPLOYEE_LIST_KEY, body, etag, generation)
 
 
 @router.post(
@@ -33,10 +85,12 @@ async def get_employees(conn: aiosqlite.Connection = Depends(get_db)):
     responses={status.HTTP_409_CONFLICT: {"model": ConflictErrorResponse}},
 )
 async def create_employee(
-    employee: EmployeeCreate, conn: aiosqlite.Connection = Depends(get_db)
+    employee: EmployeeCreate, conn: aiosqlite.Connection = Depends(get_writer)
 ):
     """Create a new employee."""
-    return await employee_service.create_employee(conn, employee)
+    created_employee = await employee_service.create_employee(conn, employee)
+    employee_response_cache.clear()
+    return created_employee
 
 
 @router.get(
@@ -46,9 +100,21 @@ async def create_employee(
     description="Retrieve details for a specific employee by UUID.",
     responses={status.HTTP_404_NOT_FOUND: {"model": NotFoundErrorResponse}},
 )
-async def get_employee(uuid: UUID, conn: aiosqlite.Connection = Depends(get_db)):
+async def get_employee(
+    uuid: UUID,
+    request: Request,
+    reader: ReaderFactory = Depends(get_reader_factory),
+):
     """Get a specific employee."""
-    return await employee_service.get_employee(conn, uuid)
+    cached = employee_response_cache.get(uuid)
+    if cached is not None:
+        return _conditional_response(request, *cached)
+
+    generation = employee_response_cache.generation
+    async with reader() as conn:
+        employee = await employee_service.get_employee(conn, uuid)
+    body, etag = _serialize(employee_adapter, employee)
+    return _cached_response(request, uuid, body, etag, generation)
 
 
 @router.put(
@@ -62,10 +128,14 @@ async def get_employee(uuid: UUID, conn: aiosqlite.Connection = Depends(get_db))
     },
 )
 async def update_employee(
-    uuid: UUID, employee: EmployeeUpdate, conn: aiosqlite.Connection = Depends(get_db)
+    uuid: UUID,
+    employee: EmployeeUpdate,
+    conn: aiosqlite.Connection = Depends(get_writer),
 ):
     """Update a specific employee."""
-    return await employee_service.update_employee(conn, uuid, employee)
+    updated_employee = await employee_service.update_employee(conn, uuid, employee)
+    employee_response_cache.clear()
+    return updated_employee
 
 
 @router.delete(
@@ -75,7 +145,8 @@ async def update_employee(
     description="Delete a specific employee and all associated timesheets.",
     responses={status.HTTP_404_NOT_FOUND: {"model": NotFoundErrorResponse}},
 )
-async def delete_employee(uuid: UUID, conn: aiosqlite.Connection = Depends(get_db)):
+async def delete_employee(uuid: UUID, conn: aiosqlite.Connection = Depends(get_writer)):
     """Delete a specific employee."""
     await employee_service.delete_employee(conn, uuid)
+    employee_response_cache.clear()
     return None
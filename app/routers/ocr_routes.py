@@ -1,15 +1,29 @@
-import io
-import json
+import asyncio
+import hashlib
 import logging
-from typing import Optional
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Dict, Hashable, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from pydantic import ValidationError
 
 from app.schemas.pdf import (
     PDFProcessErrorResponse,
     PDFProcessResponse,
 )
+from app.services.cache import TTLCache
+from app.services.executors import get_ocr_pool, replace_ocr_pool
 from app.services.pdf_service import PDFProcessingError, process_pdf
 from app.services.llm.config import config_manager
 from app.services.llm.client import LLMConfig
@@ -19,23 +33,74 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ocr", tags=["ocr"])
 
+# Serialized OCR responses keyed by PDF content hash and effective LLM
+# configuration
+pdf_result_cache = TTLCache(maxsize=256, ttl=3600)
+
+# OCR runs in progress, keyed like pdf_result_cache. Identical uploads that
+# arrive while a run is in flight wait for it and read its cached result
+# instead of calling the LLM again.
+pdf_in_flight: Dict[Hashable, asyncio.Event] = {}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_upload(file: BinaryIO) -> str:
+    """Hash an uploaded file in chunks so it is never fully loaded into memory."""
+    digest = hashlib.blake2b(digest_size=16)
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def parse_llm_config(
+    llm_config_data: Optional[str] = Form(
+        None, description="LLM configuration in JSON format"
+    ),
+) -> Optional[LLMConfig]:
+    """
+    Parse the optional LLM configuration form field into an LLMConfig.
+
+    Raises:
+        HTTPException: If the configuration is not valid JSON or fails validation
+    """
+    if not llm_config_data:
+        return None
+
+    try:
+        # Parse and validate in a single pass; invalid JSON is a ValidationError
+        llm_config = LLMConfig.model_validate_json(llm_config_data)
+    except ValidationError as e:
+        logger.error("Invalid LLM configuration: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid LLM configuration: {str(e)}",
+        )
+
+    logger.info("Using custom LLM config for request: %s", llm_config)
+    return llm_config
+
 
 @router.post(
     "/pdf",
     response_model=PDFProcessResponse,
     responses={
         status.HTTP_400_BAD_REQUEST: {"model": PDFProcessErrorResponse},
+        status.HTTP_415_UNSUPPORTED_MEDIA_TYPE: {"model": PDFProcessErrorResponse},
         status.HTTP_422_UNPROCESSABLE_ENTITY: {"model": PDFProcessErrorResponse},
         status.HTTP_500_INTERNAL_SERVER_ERROR: {"model": PDFProcessErrorResponse},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": PDFProcessErrorResponse},
     },
     summary="Process PDF with OCR",
     description="Extract structured data from PDF files using OCR and LLM processing.",
 )
 async def process_pdf_route(
+    request: Request,
     file: UploadFile = File(..., description="PDF file to process"),
-    llm_config_data: Optional[str] = Form(
-        None, description="LLM configuration in JSON format"
-    ),
+    llm_config: Optional[LLMConfig] = Depends(parse_llm_config),
+    ocr_pool: Optional[Executor] = Depends(get_ocr_pool),
 ):
     """
     Process a PDF file and extract structured data.
@@ -45,54 +110,78 @@ async def process_pdf_route(
 
     Returns a JSON response with OCR results for each page.
     """
-    # Validate file content type
+    # Validate file content type; PDFUploadMiddleware usually catches this
+    # before the upload is parsed
     if file.content_type != "application/pdf":
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
             detail="File must be a PDF",
         )
 
     route_path = "/ocr/pdf"
 
-    # Handle LLM config if provided
-    if llm_config_data:
+    try:
+        # Identical bytes with the same LLM config produce the same result.
+        # Hashing reads the whole upload, which may be spooled to disk.
+        cache_key = (
+            await asyncio.to_thread(_hash_upload, file.file),
+            route_path,
+            (llm_config or config_manager.get_config(route_path)).model_dump_json(),
+        )
+        cached_body = pdf_result_cache.get(cache_key)
+        # Wait out any identical run in flight; if it produced nothing
+        # cacheable, this request runs OCR itself
+        while cached_body is None and cache_key in pdf_in_flight:
+            logger.info("OCR in flight for %s, waiting", cache_key[0])
+            await pdf_in_flight[cache_key].wait()
+            cached_body = pdf_result_cache.get(cache_key)
+        if cached_body is not None:
+            logger.info("OCR cache hit for %s", cache_key[0])
+            return Response(content=cached_body, media_type="application/json")
+        logger.info("OCR cache miss for %s", cache_key[0])
+
+        done = pdf_in_flight[cache_key] = asyncio.Event()
         try:
-            # Parse the JSON data
-            llm_config_dict = json.loads(llm_config_data)
-            # Validate with Pydantic model
-            llm_config = LLMConfig(**llm_config_dict)
-            # Register for the route
-            config_manager.register_route_config(route_path, llm_config)
-            logger.info(f"Using custom LLM config for request: {llm_config}")
-        except (json.JSONDecodeError, ValidationError) as e:
-            logger.error(f"Invalid LLM configuration: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid LLM configuration: {str(e)}",
+            # Hand the spooled upload straight to the parser instead of
+            # copying the whole PDF into memory
+            await file.seek(0)
+
+            # Process the PDF
+            results = await process_pdf(
+                file=file.file,
+                route_path=route_path,
+                executor=ocr_pool,
+                llm_config=llm_config,
             )
 
-    try:
-        # Read file into memory
-        file_bytes = await file.read()
-        file_obj = io.BytesIO(file_bytes)
-
-        # Process the PDF
-        results = await process_pdf(
-            file=file_obj,
-            route_path=route_path,
-        )
+            # Serialize once; the same bytes are returned now and on cache hits
+            body = PDFProcessResponse(pages=results).model_dump_json()
+
+            # Only cache results where the LLM actually extracted something
+            if any(page.get("data") for page in results):
+                pdf_result_cache.set(cache_key, body)
+        finally:
+            del pdf_in_flight[cache_key]
+            done.set()
 
         # Return results
-        return PDFProcessResponse(pages=results)
+        return Response(content=body, media_type="application/json")
 
     except PDFProcessingError as e:
-        logger.error(f"PDF processing error: {str(e)}")
+        logger.error("PDF processing error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
+    except BrokenProcessPool as e:
+        logger.error("OCR process pool broken, replacing it: %s", e)
+        replace_ocr_pool(request.app, ocr_pool)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="PDF processing temporarily unavailable, please retry",
+        ) from e
     except ValidationError as e:
-        logger.error(f"Validation error: {str(e)}")
+        logger.error("Validation error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=str(e),
@@ -101,7 +190,7 @@ async def process_pdf_route(
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}",
@@ -1,16 +1,20 @@
-from typing import List
+from typing import AsyncIterator, Dict, List
 from uuid import UUID
 
 import aiosqlite
-from fastapi import APIRouter, Depends, Path, status
+from fastapi import APIRouter, Depends, Path, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
-from app.database import get_db
+from app.database import get_reader, get_writer
 from app.schemas.errors import ConflictErrorResponse, NotFoundErrorResponse
 from app.schemas.timesheet import TimesheetCreate, TimesheetResponse, TimesheetUpdate
 from app.services import timesheet_service
 
 router = APIRouter(tags=["timesheets"])
 
+timesheet_list_adapter = TypeAdapter(List[TimesheetResponse])
+
 
 @router.get(
     "/employees/{uuid}/timesheets",
@@ -20,11 +24,45 @@ router = APIRouter(tags=["timesheets"])
     responses={status.HTTP_404_NOT_FOUND: {"model": NotFoundErrorResponse}},
 )
 async def get_employee_timesheets(
-    uuid: UUID, conn: aiosqlite.Connection = Depends(get_db)
+    uuid: UUID, conn: aiosqlite.Connection = Depends(get_reader)
 ):
     """Get all timesheets for an employee."""
     timesheets = await timesheet_service.get_employee_timesheets(conn, uuid)
-    return timesheets
+    # Validate and dump the whole list in one pydantic-core call
+    body = timesheet_list_adapter.dump_json(
+        timesheet_list_adapter.validate_python(timesheets)
+    )
+    return Response(content=body, media_type="application/json")
+
+
+async def _ndjson_lines(timesheets: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    """Serialize each timesheet as one line of newline-delimited JSON."""
+    async for timesheet in timesheets:
+        yield TimesheetResponse.model_validate(timesheet).model_dump_json().encode()
+        yield b"\n"
+
+
+@router.get(
+    "/employees/{uuid}/timesheets/stream",
+    response_class=StreamingResponse,
+    summary="Stream all timesheets for an employee",
+    description=(
+        "Stream all timesheets for a specific employee as newline-delimited "
+        "JSON, one timesheet per line."
+    ),
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+        status.HTTP_404_NOT_FOUND: {"model": NotFoundErrorResponse},
+    },
+)
+async def stream_employee_timesheets(
+    uuid: UUID, conn: aiosqlite.Connection = Depends(get_reader)
+):
+    """Stream all timesheets for an employee."""
+    timesheets = await timesheet_service.iter_employee_timesheets(conn, uuid)
+    return StreamingResponse(
+        _ndjson_lines(timesheets), media_type="application/x-ndjson"
+    )
 
 
 @router.get(
@@ -38,7 +76,7 @@ async def get_employee_timesheet(
     uuid: UUID,
     year: int = Path(..., ge=2000, le=2100),
     month: int = Path(..., ge=1, le=12),
-    conn: aiosqlite.Connection = Depends(get_db),
+    conn: aiosqlite.Connection = Depends(get_reader),
 ):
     """Get a specific timesheet for an employee."""
     return await timesheet_service.get_employee_timesheet(conn, uuid, year, month)
@@ -56,12 +94,34 @@ async def get_employee_timesheet(
     },
 )
 async def create_employee_timesheet(
-    uuid: UUID, timesheet: TimesheetCreate, conn: aiosqlite.Connection = Depends(get_db)
+    uuid: UUID,
+    timesheet: TimesheetCreate,
+    conn: aiosqlite.Connection = Depends(get_writer),
 ):
     """Create a new timesheet for an employee."""
     return await timesheet_service.create_employee_timesheet(conn, uuid, timesheet)
 
 
+@router.post(
+    "/employees/{uuid}/timesheets/bulk",
+    response_model=List[TimesheetResponse],
+    status_code=status.HTTP_201_CREATED,
+    summary="Create timesheets in bulk",
+    description="Create several timesheets for a specific employee in one request.",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"model": NotFoundErrorResponse},
+        status.HTTP_409_CONFLICT: {"model": ConflictErrorResponse},
+    },
+)
+async def create_employee_timesheets(
+    uuid: UUID,
+    timesheets: List[TimesheetCreate],
+    conn: aiosqlite.Connection = Depends(get_writer),
+):
+    """Create several timesheets for an employee."""
+    return await timesheet_service.create_employee_timesheets(conn, uuid, timesheets)
+
+
 @router.put(
     "/employees/{uuid}/timesheets/{year}/{month}",
     response_model=TimesheetResponse,
@@ -74,7 +134,7 @@ async def update_employee_timesheet(
     timesheet: TimesheetUpdate,
     year: int = Path(..., ge=2000, le=2100),
     month: int = Path(..., ge=1, le=12),
-    conn: aiosqlite.Connection = Depends(get_db),
+    conn: aiosqlite.Connection = Depends(get_writer),
 ):
     """Update a specific timesheet for an employee."""
     return await timesheet_service.update_employee_timesheet(
@@ -93,7 +153,7 @@ async def delete_employee_timesheet(
     uuid: UUID,
     year: int = Path(..., ge=2000, le=2100),
     month: int = Path(..., ge=1, le=12),
-    conn: aiosqlite.Connection = Depends(get_db),
+    conn: aiosqlite.Connection = Depends(get_writer),
 ):
     """Delete a specific timesheet for an employee."""
     await timesheet_service.delete_employee_timesheet(conn, uuid, year, month)
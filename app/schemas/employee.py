@@ -1,28 +1,17 @@
+from typing import Annotated
 from uuid import UUID, uuid4
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, StringConstraints
+
+# Stripped and checked for emptiness inside pydantic-core, with no Python
+# validator call per field
+NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
 
 
 class EmployeeBase(BaseModel):
     """Base schema for employee data."""
 
-    staff_code: str = Field(..., description="Unique staff code")
-    name: str = Field(..., description="Employee name")
-
-    @field_validator("staff_code")
-    @classmethod
-    def validate_staff_code(cls, v: str) -> str:
-        """Validate that staff code is not empty."""
-        if not v.strip():
-            raise ValueError("Staff code cannot be empty")
-        return v
-
-    @field_validator("name")
-    @classmethod
-    def validate_name(cls, v: str) -> str:
-        """Validate that name is not empty."""
-        if not v.strip():
-            raise ValueError("Name cannot be empty")
-        return v
+    staff_code: NonEmptyStr = Field(..., description="Unique staff code")
+    name: NonEmptyStr = Field(..., description="Employee name")
 
 
 class EmployeeCreate(EmployeeBase):
@@ -34,24 +23,8 @@ class EmployeeCreate(EmployeeBase):
 class EmployeeUpdate(BaseModel):
     """Schema for updating an employee."""
 
-    staff_code: str | None = Field(None, description="Unique staff code")
-    name: str | None = Field(None, description="Employee name")
-
-    @field_validator("staff_code")
-    @classmethod
-    def validate_staff_code(cls, v: str | None) -> str | None:
-        """Validate that staff code is not empty if provided."""
-        if v is not None and not v.strip():
-            raise ValueError("Staff code cannot be empty")
-        return v
-
-    @field_validator("name")
-    @classmethod
-    def validate_name(cls, v: str | None) -> str | None:
-        """Validate that name is not empty if provided."""
-        if v is not None and not v.strip():
-            raise ValueError("Name cannot be empty")
-        return v
+    staff_code: NonEmptyStr | None = Field(None, description="Unique staff code")
+    name: NonEmptyStr | None = Field(None, description="Employee name")
 
 
 class EmployeeResponse(EmployeeBase):
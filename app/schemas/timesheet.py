@@ -1,5 +1,5 @@
 from uuid import UUID
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, ValidationInfo, field_validator, model_validator
 
 
 class TimesheetBase(BaseModel):
@@ -14,12 +14,16 @@ class TimesheetBase(BaseModel):
         ..., description="Total overtime hours on Sundays", ge=0
     )
 
-    @model_validator(mode="after")
-    def validate_sundays_vs_working_days(self) -> "TimesheetBase":
+    @field_validator("total_sundays_worked")
+    @classmethod
+    def validate_sundays_vs_working_days(cls, value: int, info: ValidationInfo) -> int:
         """Validate that total Sundays worked is not more than total working days."""
-        if self.total_sundays_worked > self.total_working_days:
+        # total_working_days is declared first, so it is already in info.data
+        # unless it failed its own validation
+        total_working_days = info.data.get("total_working_days")
+        if total_working_days is not None and value > total_working_days:
             raise ValueError("Total Sundays worked cannot exceed total working days")
-        return self
+        return value
 
 
 class TimesheetCreate(TimesheetBase):
@@ -44,6 +44,24 @@ async def get_employee(conn: aiosqlite.Connection, uuid: UUID) -> Dict:
     return employee
 
 
+async def ensure_employee_exists(conn: aiosqlite.Connection, uuid: UUID) -> None:
+    """
+    Verify that an employee exists without loading the full record.
+
+    Args:
+        conn: Database connection
+        uuid: Employee UUID
+
+    Raises:
+        HTTPException: If employee not found
+    """
+    if not await employee_repository.employee_exists(conn, uuid):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Employee with UUID {uuid} not found",
+        )
+
+
 async def create_employee(conn: aiosqlite.Connection, employee: EmployeeCreate) -> Dict:
     """
     Create a new employee.
@@ -58,17 +76,15 @@ async def create_employee(conn: aiosqlite.Connection, employee: EmployeeCreate)
     Raises:
         HTTPException: If staff code already exists
     """
-    # Check if staff code already exists
-    existing_employee = await employee_repository.get_employee_by_staff_code(
-        conn, employee.staff_code
-    )
-    if existing_employee:
+    # The insert is skipped, rather than failing, if the staff code is taken
+    created_employee = await employee_repository.create_employee(conn, employee)
+    if created_employee is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Employee with staff code '{employee.staff_code}' already exists",
         )
 
-    return await employee_repository.create_employee(conn, employee)
+    return created_employee
 
 
 async def update_employee(
@@ -88,21 +104,22 @@ async def update_employee(
     Raises:
         HTTPException: If employee not found or staff code already exists
     """
-    # Check if employee exists
-    await get_employee(conn, uuid)
-
-    # Check if staff code is unique if provided
-    if employee.staff_code is not None:
-        existing_employee = await employee_repository.get_employee_by_staff_code(
-            conn, employee.staff_code
+    # Nothing to change, so answer with the current record
+    if not employee.model_dump(exclude_none=True):
+        return await get_employee(conn, uuid)
+
+    # A single UPDATE ... RETURNING both applies the change and reports a
+    # missing employee; the UNIQUE constraint reports a taken staff code
+    try:
+        updated_employee = await employee_repository.update_employee(
+            conn, uuid, employee
         )
-        if existing_employee and str(existing_employee["uuid"]) != str(uuid):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=f"Employee with staff code '{employee.staff_code}' already exists",
-            )
+    except aiosqlite.IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Employee with staff code '{employee.staff_code}' already exists",
+        ) from e
 
-    updated_employee = await employee_repository.update_employee(conn, uuid, employee)
     if not updated_employee:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -123,9 +140,7 @@ async def delete_employee(conn: aiosqlite.Connection, uuid: UUID) -> None:
     Raises:
         HTTPException: If employee not found
     """
-    # Check if employee exists
-    await get_employee(conn, uuid)
-
+    # The DELETE's row count tells us whether the employee existed
     deleted = await employee_repository.delete_employee(conn, uuid)
     if not deleted:
         raise HTTPException(
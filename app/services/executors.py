@@ -0,0 +1,40 @@
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import FastAPI, Request
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+
+
+def create_ocr_pool() -> ProcessPoolExecutor:
+    """
+    Create the process pool used for CPU-bound PDF parsing.
+
+    Workers are spawned rather than forked because the parent process already
+    runs database and event loop threads by the time the pool is first used.
+    """
+    return ProcessPoolExecutor(
+        max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+async def get_ocr_pool(request: Request) -> Optional[Executor]:
+    """
+    Return the application's OCR process pool, or None when it isn't running.
+    """
+    return getattr(request.app.state, "ocr_pool", None)
+
+
+def replace_ocr_pool(app: FastAPI, broken: Executor) -> None:
+    """
+    Replace the application's OCR process pool after one of its workers died.
+
+    A broken pool rejects every later submission, so without a replacement PDF
+    parsing would fail until restart. Requests that saw the same broken pool
+    replace it only once.
+    """
+    if getattr(app.state, "ocr_pool", None) is broken:
+        app.state.ocr_pool = create_ocr_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
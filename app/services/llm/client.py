@@ -1,29 +1,82 @@
-import base64
-import json
+import asyncio
 import logging
 import os
 import re
+import weakref
 from enum import Enum
+from functools import cache, cached_property
 from typing import Any, Dict, List, Optional, Union
 
 import httpx
 import litellm
-from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict
+from pydantic_core import from_json
 from tenacity import (
-    retry,
+    AsyncRetrying,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Transient failures worth retrying: network errors, timeouts, rate limits
+# (429) and provider outages (5xx). Other 4xx errors such as bad requests and
+# auth failures fail the same way every time, so they are raised immediately
+# rather than re-sending the whole encoded document.
+RETRYABLE_LLM_ERRORS = (
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    litellm.exceptions.APIConnectionError,
+    litellm.exceptions.Timeout,
+    litellm.exceptions.RateLimitError,
+    litellm.exceptions.ServiceUnavailableError,
+    litellm.exceptions.InternalServerError,
+)
+
+# Body of a Markdown code fence, e.g. ```json ... ```, compiled once
+_JSON_FENCE_PATTERN = re.compile(r"```(?:json)?[ \t]*\r?\n(.*?)```", re.DOTALL)
+
+
+def _find_json_object(content: str) -> Optional[str]:
+    """Find the first balanced {...} block in text surrounding a JSON object.
+
+    Braces inside string literals are ignored, so a single forward pass is
+    enough to find where the outermost object ends.
+
+    Args:
+        content: Text that may contain a JSON object, e.g. in a code fence
+
+    Returns:
+        The first balanced object substring, or None if there is none
+    """
+    start = content.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(content)):
+        char = content[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return content[start : index + 1]
+    return None
+
 
 class LLMProvider(str, Enum):
     """Supported LLM providers."""
@@ -33,32 +86,47 @@ class LLMProvider(str, Enum):
     GEMINI = "gemini"
 
 
+# Environment defaults for LLMConfig, read once rather than per instance
+DEFAULT_LLM_PROVIDER = LLMProvider(
+    os.getenv("DEFAULT_LLM_PROVIDER", LLMProvider.OPENAI)
+)
+DEFAULT_LLM_MODEL = os.getenv("DEFAULT_LLM_MODEL", "gpt-4-vision")
+LLM_REQUEST_TIMEOUT = int(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Maximum number of LLM requests one client has in flight across all
+# documents, so concurrent uploads cannot flood the provider
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+
+
 class LLMConfig(BaseModel):
     """LLM configuration settings."""
 
-    provider: LLMProvider = Field(
-        default_factory=lambda: os.getenv("DEFAULT_LLM_PROVIDER", LLMProvider.OPENAI)
-    )
-    model: str = Field(
-        default_factory=lambda: os.getenv("DEFAULT_LLM_MODEL", "gpt-4-vision")
-    )
-    request_timeout: int = Field(
-        default_factory=lambda: int(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
-    )
-    max_retries: int = Field(
-        default_factory=lambda: int(os.getenv("LLM_MAX_RETRIES", "3"))
-    )
+    model_config = ConfigDict(frozen=True)
+
+    provider: LLMProvider = DEFAULT_LLM_PROVIDER
+    model: str = DEFAULT_LLM_MODEL
+    request_timeout: int = LLM_REQUEST_TIMEOUT
+    max_retries: int = LLM_MAX_RETRIES
     temperature: float = 0.0
     max_tokens: Optional[int] = None
 
+    @cached_property
+    def model_string(self) -> str:
+        """The litellm model string for the provider and model.
+
+        The config is frozen, so this is built once per instance.
+        """
+        if self.provider == LLMProvider.ANTHROPIC:
+            return f"anthropic/{self.model}"
+        if self.provider == LLMProvider.GEMINI:
+            return f"gemini/{self.model}"
+        # OpenAI models are already in correct format
+        return self.model
+
     def get_model_string(self) -> str:
         """Get the litellm model string for the provider and model."""
-        model_map = {
-            LLMProvider.OPENAI: lambda m: m,  # OpenAI models are already in correct format
-            LLMProvider.ANTHROPIC: lambda m: f"anthropic/{m}",
-            LLMProvider.GEMINI: lambda m: f"gemini/{m}",
-        }
-        return model_map[self.provider](self.model)
+        return self.model_string
 
 
 class LLMClient:
@@ -82,19 +150,40 @@ class LLMClient:
         # Configure litellm
         litellm.request_timeout = self.config.request_timeout
 
-    @retry(
-        retry=retry_if_exception_type(
-            (httpx.HTTPError, litellm.exceptions.ServiceUnavailableError)
-        ),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        stop=stop_after_attempt(lambda self: self.config.max_retries),
-        reraise=True,
-    )
+        # Retry policy for transient failures. Retry state is kept per
+        # iteration, so each call iterates over its own copy.
+        self._retrying = AsyncRetrying(
+            retry=retry_if_exception_type(RETRYABLE_LLM_ERRORS),
+            wait=wait_exponential(multiplier=1, min=2, max=10),
+            stop=stop_after_attempt(self.config.max_retries),
+            reraise=True,
+        )
+
+        # In-flight limit per event loop, created on first use by _in_flight().
+        # Only held while a request is in flight, not during retry backoff.
+        self._in_flight_limits: (
+            "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+        ) = weakref.WeakKeyDictionary()
+
+    def _in_flight(self) -> asyncio.Semaphore:
+        """Return the semaphore capping in-flight requests on the running loop.
+
+        The default client is cached for the whole process and can outlive an
+        event loop, while a semaphore binds to the first loop that waits on
+        it, so each loop gets its own.
+        """
+        loop = asyncio.get_running_loop()
+        limit = self._in_flight_limits.get(loop)
+        if limit is None:
+            limit = self._in_flight_limits[loop] = asyncio.Semaphore(LLM_MAX_IN_FLIGHT)
+        return limit
+
     async def completion(
         self,
         messages: List[Dict[str, Any]],
         config: Optional[LLMConfig] = None,
-        response_format: Optional[Dict[str, str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        prompt_cache_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Make a completion request to the LLM.
 
@@ -102,6 +191,8 @@ class LLMClient:
             messages: List of message dictionaries to send to the LLM
             config: Optional LLM configuration to override the default
             response_format: Optional response format configuration
+            prompt_cache_key: Optional key identifying a prompt prefix shared
+                across requests, so the provider can reuse its prefill
 
         Returns:
             Dictionary containing LLM response data
@@ -109,30 +200,113 @@ class LLMClient:
         # Use provided config or default
         config = config or self.config
 
+        retrying = self._retrying.copy(stop=stop_after_attempt(config.max_retries))
+        async for attempt in retrying:
+            with attempt:
+                async with self._in_flight():
+                    return await self._do_completion(
+                        messages, config, response_format, prompt_cache_key
+                    )
+
+    async def _do_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        config: LLMConfig,
+        response_format: Optional[Dict[str, Any]],
+        prompt_cache_key: Optional[str],
+    ) -> Dict[str, Any]:
+        """Make a single completion request to the LLM, without retries.
+
+        Args:
+            messages: List of message dictionaries to send to the LLM
+            config: LLM configuration to use
+            response_format: Optional response format configuration
+            prompt_cache_key: Optional key identifying a shared prompt prefix
+
+        Returns:
+            Dictionary containing LLM response data
+        """
+
+        extra_params: Dict[str, Any] = {}
+        if prompt_cache_key:
+            if config.provider == LLMProvider.ANTHROPIC:
+                messages = self._mark_cache_breakpoint(messages)
+            elif config.provider == LLMProvider.OPENAI:
+                extra_params["prompt_cache_key"] = prompt_cache_key
+
         try:
             logger.info(
-                f"Sending completion request to {config.provider} model {config.model}"
+                "Sending completion request to %s model %s",
+                config.provider,
+                config.model,
             )
 
             # Make the API call
             response = await litellm.acompletion(
-                model=config.get_model_string(),
+                model=config.model_string,
                 messages=messages,
                 temperature=config.temperature,
                 max_tokens=config.max_tokens,
                 response_format=response_format or {"type": "json_object"},
+                **extra_params,
             )
 
             # Parse the response
             content = response.choices[0].message.content
-            logger.info(f"Received response from LLM: {content[:100]}...")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Received response from LLM: %s...", content[:100])
 
             return self._parse_llm_response(content)
 
         except Exception as e:
-            logger.error(f"Error calling LLM API: {str(e)}")
+            logger.error("Error calling LLM API: %s", e)
             raise
 
+    def _mark_cache_breakpoint(
+        self, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Mark the end of the static prompt prefix for Anthropic prompt caching.
+
+        The breakpoint is placed on the last text part that precedes the first
+        non-text part (e.g. a document), so everything before the per-request
+        attachments is cached. The input messages are left unmodified.
+
+        Args:
+            messages: List of message dictionaries to send to the LLM
+
+        Returns:
+            Copy of the messages with a cache_control marker on the prefix
+        """
+        marked = []
+        breakpoint_index = None
+        has_reached_attachment = False
+
+        for message in messages:
+            content = message["content"]
+            parts = (
+                [{"type": "text", "text": content}]
+                if isinstance(content, str)
+                else list(content)
+            )
+            marked.append({**message, "content": parts})
+
+            for part_index, part in enumerate(parts):
+                if has_reached_attachment or part.get("type") != "text":
+                    has_reached_attachment = True
+                    break
+                breakpoint_index = (len(marked) - 1, part_index)
+
+        if breakpoint_index is None:
+            return messages
+
+        message_index, part_index = breakpoint_index
+        parts = marked[message_index]["content"]
+        parts[part_index] = {
+            **parts[part_index],
+            "cache_control": {"type": "ephemeral"},
+        }
+        return marked
+
     def _parse_llm_response(self, content: str) -> Dict[str, Any]:
         """Parse LLM response content into structured data.
 
@@ -142,19 +316,23 @@ class LLMClient:
         Returns:
             Dictionary containing parsed data
         """
-        # First try direct JSON parsing
+        # First try direct JSON parsing with pydantic-core's parser
         try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # If direct parsing fails, try to extract JSON from content
-            try:
-                # Look for JSON-like structure in the content
-                json_match = re.search(r"(\{.*\})", content, re.DOTALL)
-                if json_match:
-                    potential_json = json_match.group(1)
-                    return json.loads(potential_json)
-            except Exception:
-                pass
+            return from_json(content)
+        except ValueError:
+            # If direct parsing fails, try a fenced block first, then the first
+            # balanced object anywhere in the content
+            fence = _JSON_FENCE_PATTERN.search(content)
+            candidates = [fence.group(1)] if fence else []
+            candidates.append(content)
+            for candidate in candidates:
+                potential_json = _find_json_object(candidate)
+                if potential_json is None:
+                    continue
+                try:
+                    return from_json(potential_json)
+                except ValueError:
+                    pass
 
             # If all parsing attempts fail, return error object
             return {
@@ -163,5 +341,42 @@ class LLMClient:
             }
 
 
-# Create a default client instance
-default_client = LLMClient()
+# Connection limits for the HTTP client shared by all litellm requests
+LLM_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+
+def open_llm_http_client() -> httpx.AsyncClient:
+    """Route litellm requests through one pooled HTTP client.
+
+    Reusing keep-alive connections avoids a new TCP and TLS handshake per
+    completion, and HTTP/2 multiplexes concurrent page requests to the same
+    provider over one connection. The caller owns the client and must pass
+    it to close_llm_http_client() on shutdown.
+
+    Returns:
+        The shared HTTP client
+    """
+    client = httpx.AsyncClient(
+        http2=True,
+        limits=LLM_HTTP_LIMITS,
+        timeout=LLM_REQUEST_TIMEOUT,
+    )
+    litellm.aclient_session = client
+    return client
+
+
+async def close_llm_http_client(client: httpx.AsyncClient) -> None:
+    """Detach the shared HTTP client from litellm and close it.
+
+    Args:
+        client: Client returned by open_llm_http_client()
+    """
+    if litellm.aclient_session is client:
+        litellm.aclient_session = None
+    await client.aclose()
+
+
+@cache
+def get_default_client() -> LLMClient:
+    """Get the shared default LLM client, creating it on first use."""
+    return LLMClient()
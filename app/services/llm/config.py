@@ -1,7 +1,7 @@
 import os
 from typing import Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from app.services.llm.client import LLMConfig, LLMProvider
 
@@ -9,6 +9,8 @@ from app.services.llm.client import LLMConfig, LLMProvider
 class RouteConfig(BaseModel):
     """Configuration for a specific API route."""
 
+    model_config = ConfigDict(frozen=True)
+
     route_path: str
     llm_config: LLMConfig
 
@@ -1,15 +1,97 @@
+import asyncio
 import base64
-import json
+import copy
 import logging
+import os
 from typing import Any, Dict, List, Optional
 
-from app.services.llm.client import LLMClient, default_client
+from app.services.llm.client import LLMClient, LLMConfig, get_default_client
 from app.services.llm.config import config_manager
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of pages of one document sent to the LLM at the same time
+MAX_OCR_CONCURRENCY = int(os.getenv("MAX_OCR_CONCURRENCY", "4"))
+
+# Data URI prefix for base64-encoded PDF pages
+PDF_DATA_URI_PREFIX = "data:application/pdf;base64,"
+
+# PDFs at least this large are base64-encoded in a worker thread, so the
+# event loop keeps serving the other requests in flight meanwhile
+BASE64_OFFLOAD_THRESHOLD = 256 * 1024
+
+
+# Prompts are identical for every request, so they are built once
+OCR_SYSTEM_PROMPT = "You are an expert document processor specialized in extracting information from PDFs."
+
+OCR_USER_PROMPT = """You are an expert document processor specialized in extracting information from scanned copies of timesheets. Please extract the following fields from the PDF document:
+- name: string
+- staff_code: string
+- month: string
+- total_working_days: int
+- total_ot_hours: int
+- total_working_sundays: int
+- total_sunday_ot: int
+
+Some of the fields may be ambiguous due to human error. Ensure that the following rules are followed, and fix any deviations:
+- staff_code must follow the naming convention of `<letter>-<numbers>`
+- month must follow the naming convention of `%b-%Y`
+
+Information about each PDF:
+- Sundays/public holidays are highlighted. If the start/end or HR fields are updated for that date, that means the person worked on the day. If they are left blank, then the person did not work on that day. The supervisor's signature column indicates if the work on that date has been verified.
+
+For each page, return a dictionary with 'page_number' which is an auto incrementing field, 'explanation' which details the reasoning you have used to infer ambiguous fields, and 'data' which contains the extracted fields.
+
+Return the result as a JSON object with 'pages' as the key, containing an array of page results.
+{{ 'pages': [{{ 'page_number': int, 'data': {{ 'field1': 'value1', ... }} }}, ...] }}"""
+
+# Fields extracted from each timesheet page, matching OCR_USER_PROMPT. Values
+# are nullable because a field may be unreadable on a scanned page.
+OCR_PAGE_FIELDS = {
+    "name": {"type": ["string", "null"]},
+    "staff_code": {"type": ["string", "null"]},
+    "month": {"type": ["string", "null"]},
+    "total_working_days": {"type": ["integer", "null"]},
+    "total_ot_hours": {"type": ["integer", "null"]},
+    "total_working_sundays": {"type": ["integer", "null"]},
+    "total_sunday_ot": {"type": ["integer", "null"]},
+}
+
+# Structured output schema, so providers that support it return well-formed
+# page results instead of free-form JSON
+OCR_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "timesheet_ocr",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "pages": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "page_number": {"type": "integer"},
+                            "explanation": {"type": "string"},
+                            "data": {
+                                "type": "object",
+                                "properties": OCR_PAGE_FIELDS,
+                                "required": list(OCR_PAGE_FIELDS),
+                                "additionalProperties": False,
+                            },
+                        },
+                        "required": ["page_number", "explanation", "data"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["pages"],
+            "additionalProperties": False,
+        },
+    },
+}
+
 
 class OCRService:
     """Service for performing OCR on documents using LLM."""
@@ -18,53 +100,177 @@ class OCRService:
         """Initialize the OCR service.
 
         Args:
-            llm_client: LLM client to use. If None, default client will be used.
+            llm_client: LLM client to use. If None, the default client is
+                created on first use.
         """
-        self.llm_client = llm_client or default_client
+        self._llm_client = llm_client
+
+    @property
+    def llm_client(self) -> LLMClient:
+        """LLM client used for OCR requests."""
+        if self._llm_client is None:
+            self._llm_client = get_default_client()
+        return self._llm_client
 
     async def process_document(
         self,
         pdf_pages: List[bytes],
         route_path: Optional[str] = None,
+        llm_config: Optional[LLMConfig] = None,
     ) -> List[Dict[str, Any]]:
         """Process document PDF pages using LLM-based OCR.
 
+        Each distinct page is sent to the LLM as its own request, with at
+        most MAX_OCR_CONCURRENCY requests in flight at once. Repeated pages
+        share the result of their first occurrence.
+
         Args:
             pdf_pages: List of document page PDFs as bytes
             route_path: Optional API route path to get specific LLM config
+            llm_config: Optional LLM config overriding the route config for
+                this call only
 
         Returns:
             List of dictionaries with OCR results for each page
         """
-        # Get route-specific LLM config if available
-        llm_config = config_manager.get_config(route_path)
-        logger.info(f"Using LLM config for route {route_path}: {llm_config}")
+        # Fall back to the route-specific LLM config if no override is given
+        llm_config = llm_config or config_manager.get_config(route_path)
+        logger.info("Using LLM config for route %s: %s", route_path, llm_config)
+
+        semaphore = asyncio.Semaphore(MAX_OCR_CONCURRENCY)
+
+        async def process_page(page_number: int, pdf_page: bytes) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._process_page(
+                    pdf_page, page_number, route_path, llm_config
+                )
+
+        # Identical pages, e.g. a duplicated attachment, are sent to the LLM
+        # once under the number of their first occurrence
+        first_page_numbers: Dict[bytes, int] = {}
+        for page_number, pdf_page in enumerate(pdf_pages, start=1):
+            first_page_numbers.setdefault(pdf_page, page_number)
+
+        results = await asyncio.gather(
+            *(
+                process_page(page_number, pdf_page)
+                for pdf_page, page_number in first_page_numbers.items()
+            )
+        )
+        page_data = {
+            pdf_page: result["data"]
+            for pdf_page, result in zip(first_page_numbers, results, strict=True)
+        }
+
+        return [
+            {"page_number": page_number, "data": dict(page_data[pdf_page])}
+            for page_number, pdf_page in enumerate(pdf_pages, start=1)
+        ]
+
+    async def process_whole_document(
+        self,
+        pdf_document: bytes,
+        route_path: Optional[str] = None,
+        llm_config: Optional[LLMConfig] = None,
+    ) -> List[Dict[str, Any]]:
+        """Process a multi-page PDF in a single LLM request.
+
+        For models that read multi-page PDFs directly. This skips splitting
+        the document and sends the prompt once rather than once per page, at
+        the cost of processing the pages sequentially within one request.
+
+        Args:
+            pdf_document: The whole PDF document as bytes
+            route_path: Optional API route path to get specific LLM config
+            llm_config: Optional LLM config overriding the route config for
+                this call only
 
-        # Create the messages for the LLM request
-        messages = self._create_pdf_messages(pdf_pages)
+        Returns:
+            List of dictionaries with OCR results for each page
+        """
+        llm_config = llm_config or config_manager.get_config(route_path)
+        logger.info("Using LLM config for route %s: %s", route_path, llm_config)
 
-        # Process all pages with the LLM
         try:
-            results = await self.llm_client.completion(
-                messages=messages,
-                config=llm_config,
-                response_format={"type": "json_object"},
-            )
+            results = await self._extract(pdf_document, route_path, llm_config)
+        except Exception as e:
+            logger.error("Error processing document with LLM: %s", e)
+            # Return an error result with all required fields
+            return [{"page_number": 1, "data": {}}]
+
+        return self._format_results(results)
+
+    async def _extract(
+        self,
+        pdf: bytes,
+        route_path: Optional[str],
+        llm_config: LLMConfig,
+    ) -> Dict[str, Any]:
+        """Send a PDF to the LLM and return its raw OCR result.
+
+        Args:
+            pdf: PDF bytes to process, either one page or a whole document
+            route_path: Optional API route path, used for the prompt cache key
+            llm_config: LLM config to use for the request
 
-            logger.info(f"Raw LLM results: {str(results)[:500]}...")
+        Returns:
+            Raw results from the LLM
+        """
+        # Create the messages for the LLM request, off the event loop for
+        # PDFs large enough for encoding to stall it
+        if len(pdf) >= BASE64_OFFLOAD_THRESHOLD:
+            messages = await asyncio.to_thread(self._create_pdf_messages, [pdf])
+        else:
+            messages = self._create_pdf_messages([pdf])
+
+        return await self.llm_client.completion(
+            messages=messages,
+            config=llm_config,
+            # litellm may rewrite the schema for some providers, so each
+            # request gets its own copy
+            response_format=copy.deepcopy(OCR_RESPONSE_FORMAT),
+            prompt_cache_key=f"{route_path or 'default'}:{llm_config.model}",
+        )
+
+    async def _process_page(
+        self,
+        pdf_page: bytes,
+        page_number: int,
+        route_path: Optional[str],
+        llm_config: LLMConfig,
+    ) -> Dict[str, Any]:
+        """Process a single PDF page using LLM-based OCR.
+
+        Args:
+            pdf_page: PDF page bytes to process
+            page_number: 1-based position of the page in the document
+            route_path: Optional API route path, used for the prompt cache key
+            llm_config: LLM config to use for the request
 
-            # Structure the results by page
-            return self._format_results(results)
+        Returns:
+            Dictionary with the OCR result for the page
+        """
+        try:
+            results = await self._extract(pdf_page, route_path, llm_config)
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Raw LLM results for page %d: %s...",
+                    page_number,
+                    str(results)[:500],
+                )
+
+            # The LLM only saw this page, so number it by its place in the document
+            pages = self._format_results(results)
+            return {
+                "page_number": page_number,
+                "data": pages[0]["data"] if pages else {},
+            }
 
         except Exception as e:
-            logger.error(f"Error processing document with LLM: {str(e)}")
+            logger.error("Error processing page %d with LLM: %s", page_number, e)
             # Return an error result with all required fields
-            return [
-                {
-                    "page_number": 1,
-                    "data": {},
-                }
-            ]
+            return {"page_number": page_number, "data": {}}
 
     def _create_pdf_messages(
         self,
@@ -78,53 +284,26 @@ class OCRService:
         Returns:
             List of message dictionaries to send to the LLM
         """
-        # Create prompts
-        system_prompt = "You are an expert document processor specialized in extracting information from PDFs."
-
-        user_prompt = """You are an expert document processor specialized in extracting information from scanned copies of timesheets. Please extract the following fields from the PDF document:
-- name: string
-- staff_code: string
-- month: string
-- total_working_days: int
-- total_ot_hours: int
-- total_working_sundays: int
-- total_sunday_ot: int
-
-Some of the fields may be ambiguous due to human error. Ensure that the following rules are followed, and fix any deviations:
-- staff_code must follow the naming convention of `<letter>-<numbers>`
-- month must follow the naming convention of `%b-%Y`
-
-Information about each PDF:
-- Sundays/public holidays are highlighted. If the start/end or HR fields are updated for that date, that means the person worked on the day. If they are left blank, then the person did not work on that day. The supervisor's signature column indicates if the work on that date has been verified.
-
-For each page, return a dictionary with 'page_number' which is an auto incrementing field, 'explanation' which details the reasoning you have used to infer ambiguous fields, and 'data' which contains the extracted fields.
-
-Return the result as a JSON object with 'pages' as the key, containing an array of page results.
-{{ 'pages': [{{ 'page_number': int, 'data': {{ 'field1': 'value1', ... }} }}, ...] }}"""
-
-        # Prepare PDF pages for the LLM
-        pdf_contents = []
-        for pdf_page in pdf_pages:
-            # Convert PDF page bytes to base64
-            base64_pdf = base64.b64encode(pdf_page).decode("utf-8")
-
-            # Add to message content
-            pdf_contents.append(
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:application/pdf;base64,{base64_pdf}",
-                        "detail": "high",
-                    },
-                }
-            )
+        # Prepare PDF pages for the LLM as base64 data URIs. The encoded bytes
+        # are plain ASCII, which decodes without UTF-8 validation.
+        pdf_contents = [
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": PDF_DATA_URI_PREFIX
+                    + base64.b64encode(pdf_page).decode("ascii"),
+                    "detail": "high",
+                },
+            }
+            for pdf_page in pdf_pages
+        ]
 
         # Create the full message
         return [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": OCR_SYSTEM_PROMPT},
             {
                 "role": "user",
-                "content": [{"type": "text", "text": user_prompt}, *pdf_contents],
+                "content": [{"type": "text", "text": OCR_USER_PROMPT}, *pdf_contents],
             },
         ]
 
@@ -137,35 +316,30 @@ Return the result as a JSON object with 'pages' as the key, containing an array
         Returns:
             List of formatted page results
         """
-        # Validate that results is a dictionary with 'pages' key
-        if (
-            isinstance(results, dict)
-            and "pages" in results
-            and isinstance(results["pages"], list)
-        ):
-            formatted_results = []
-            for i, page in enumerate(results["pages"]):
-                if not isinstance(page, dict):
-                    logger.warning(f"Unexpected page result type: {type(page)}")
-                    continue
-
-                # Create standardized result structure with only page_number and data
-                formatted_result = {
-                    "page_number": page.get("page_number", i + 1),
-                    "data": (
-                        page.get("data", {})
-                        if isinstance(page.get("data"), dict)
-                        else {}
-                    ),
-                }
-
-                formatted_results.append(formatted_result)
-
-            return formatted_results
-        else:
-            logger.error(f"Unexpected result format from LLM: {results}")
+        # Validate that results is a dictionary with a 'pages' list
+        pages = results.get("pages") if isinstance(results, dict) else None
+        if not isinstance(pages, list):
+            logger.error("Unexpected result format from LLM: %s", results)
             return [{"page_number": 1, "data": {}}]
 
+        # Keep only page_number and data, dropping entries that aren't dicts
+        formatted_results = [
+            {
+                "page_number": page.get("page_number", i + 1),
+                "data": data if isinstance(data := page.get("data"), dict) else {},
+            }
+            for i, page in enumerate(pages)
+            if isinstance(page, dict)
+        ]
+
+        if len(formatted_results) != len(pages):
+            logger.warning(
+                "Skipped %d page results that were not objects",
+                len(pages) - len(formatted_results),
+            )
+
+        return formatted_results
+
 
 # Create a default OCR service instance
 default_ocr_service = OCRService()
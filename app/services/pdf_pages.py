@@ -0,0 +1,104 @@
+# PDF parsing and page splitting. OCR process pool workers are spawned fresh
+# and import this module, so it must only depend on pypdf: importing the LLM
+# client and litellm would cost each worker seconds and ~150 MB.
+import io
+from typing import BinaryIO, List
+
+from pypdf import PdfReader, PdfWriter
+
+
+class PDFProcessingError(Exception):
+    """Exception raised for errors in the PDF processing."""
+
+    pass
+
+
+def validate_pdf(file: BinaryIO) -> bool:
+    """
+    Validate if the file is a valid PDF.
+
+    Args:
+        file: The file to validate
+
+    Returns:
+        bool: True if valid PDF, False otherwise
+
+    Raises:
+        PDFProcessingError: If there's an error during validation
+    """
+    try:
+        # Reset file pointer to beginning
+        file.seek(0)
+
+        # Check if file is a PDF
+        pdf = PdfReader(file)
+
+        # Reset file pointer to beginning again after validation
+        file.seek(0)
+
+        # If we can read at least one page, it's a valid PDF
+        return len(pdf.pages) > 0
+    except Exception as e:
+        raise PDFProcessingError(f"Error validating PDF: {str(e)}")
+
+
+def _split_pages(pdf: PdfReader) -> List[bytes]:
+    """
+    Write each page of an already parsed PDF out as its own PDF.
+
+    Args:
+        pdf: The parsed PDF to split
+
+    Returns:
+        List[bytes]: List of PDF pages as PDF bytes
+    """
+    pages = []
+    for page in pdf.pages:
+        # Create a PDF writer for a single page
+        writer = PdfWriter()
+        writer.add_page(page)
+
+        # Write the page to an in-memory buffer and keep its bytes
+        page_bytes = io.BytesIO()
+        writer.write(page_bytes)
+        pages.append(page_bytes.getvalue())
+
+    return pages
+
+
+def prepare_pdf_pages(file: BinaryIO) -> List[bytes]:
+    """
+    Validate a PDF and split it into single-page PDFs.
+
+    The file is parsed once, and the same reader is used for validation and
+    splitting.
+
+    Args:
+        file: The PDF file to prepare
+
+    Returns:
+        List[bytes]: List of PDF pages as PDF bytes
+
+    Raises:
+        PDFProcessingError: If the file is not a valid PDF or cannot be split
+    """
+    try:
+        file.seek(0)
+        pdf = PdfReader(file)
+        page_count = len(pdf.pages)
+    except Exception as e:
+        raise PDFProcessingError(f"Error validating PDF: {str(e)}") from e
+
+    # A PDF without any readable page is not a valid upload
+    if page_count == 0:
+        raise PDFProcessingError("Invalid PDF file")
+
+    try:
+        return _split_pages(pdf)
+    except Exception as e:
+        raise PDFProcessingError(f"Error splitting PDF: {str(e)}") from e
+
+
+def prepare_pdf_bytes(pdf_bytes: bytes) -> List[bytes]:
+    """Process pool entry point for prepare_pdf_pages (file handles don't pickle)."""
+    return prepare_pdf_pages(io.BytesIO(pdf_bytes))
@@ -1,96 +1,29 @@
-import io
+import asyncio
+import os
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
 from typing import BinaryIO, Dict, List, Optional, Any
 
-from pypdf import PdfReader, PdfWriter
-
+from app.services.llm.client import LLMConfig
 from app.services.llm.ocr_service import default_ocr_service
+from app.services.pdf_pages import (
+    PDFProcessingError,
+    prepare_pdf_bytes,
+    prepare_pdf_pages,
+    validate_pdf,
+)
 
-
-class PDFProcessingError(Exception):
-    """Exception raised for errors in the PDF processing."""
-
-    pass
-
-
-def validate_pdf(file: BinaryIO) -> bool:
-    """
-    Validate if the file is a valid PDF.
-
-    Args:
-        file: The file to validate
-
-    Returns:
-        bool: True if valid PDF, False otherwise
-
-    Raises:
-        PDFProcessingError: If there's an error during validation
-    """
-    try:
-        # Reset file pointer to beginning
-        file.seek(0)
-
-        # Check if file is a PDF
-        pdf = PdfReader(file)
-
-        # Reset file pointer to beginning again after validation
-        file.seek(0)
-
-        # If we can read at least one page, it's a valid PDF
-        return len(pdf.pages) > 0
-    except Exception as e:
-        raise PDFProcessingError(f"Error validating PDF: {str(e)}")
-
-
-def split_pdf(file: BinaryIO) -> List[bytes]:
-    """
-    Split a PDF file into individual pages as PDF bytes.
-
-    Args:
-        file: The PDF file to split
-
-    Returns:
-        List[bytes]: List of PDF pages as PDF bytes
-
-    Raises:
-        PDFProcessingError: If there's an error during splitting
-    """
-    try:
-        # Reset file pointer to beginning
-        file.seek(0)
-
-        # Load PDF
-        pdf = PdfReader(file)
-        page_count = len(pdf.pages)
-
-        # Create a list to hold individual page bytes
-        pages = []
-
-        # Process each page
-        for i in range(page_count):
-            # Create a PDF writer for a single page
-            writer = PdfWriter()
-
-            # Add the page from the original PDF
-            writer.add_page(pdf.pages[i])
-
-            # Create a BytesIO object to hold the PDF bytes
-            page_bytes = io.BytesIO()
-
-            # Write the page to the BytesIO object
-            writer.write(page_bytes)
-
-            # Get the bytes and add to pages list
-            page_bytes.seek(0)
-            pages.append(page_bytes.getvalue())
-
-        return pages
-    except Exception as e:
-        raise PDFProcessingError(f"Error splitting PDF: {str(e)}")
+# Split PDFs into single pages that are sent to the LLM concurrently. Disable
+# for models that read multi-page PDFs, to send each document in one request.
+OCR_SPLIT_PAGES = os.getenv("OCR_SPLIT_PAGES", "true").lower() == "true"
 
 
 async def process_pdf(
     file: BinaryIO,
     route_path: str = "/ocr/pdf",
+    executor: Optional[Executor] = None,
+    llm_config: Optional[LLMConfig] = None,
+    split_pages: Optional[bool] = None,
 ) -> List[Dict[str, Any]]:
     """
     Process a PDF file: validate, split into pages, and perform OCR using LLM.
@@ -98,28 +31,51 @@ async def process_pdf(
     Args:
         file: The PDF file to process
         route_path: API route path for LLM configuration
+        executor: Optional process pool for the CPU-bound PDF parsing. If None,
+            parsing runs in a worker thread so the event loop stays free.
+        llm_config: Optional LLM configuration for this call only. If None, the
+            configuration registered for route_path is used.
+        split_pages: Whether to OCR each page in its own LLM request or the
+            whole PDF in one. If None, OCR_SPLIT_PAGES is used.
 
     Returns:
         List[Dict[str, Any]]: List of dictionaries with OCR results for each page
 
     Raises:
         PDFProcessingError: If there's an error during processing
+        BrokenProcessPool: If a worker in executor died; the pool is unusable
     """
-    # Validate PDF - if invalid, this will raise PDFProcessingError
-    if not validate_pdf(file):
-        raise PDFProcessingError("Invalid PDF file")
+    if split_pages is None:
+        split_pages = OCR_SPLIT_PAGES
 
     try:
-        # Split PDF into pages
-        pdf_pages = split_pdf(file)
+        if not split_pages:
+            # Only validate; the LLM reads the original document as is
+            if not await asyncio.to_thread(validate_pdf, file):
+                raise PDFProcessingError("Invalid PDF file")
+            pdf_bytes = await asyncio.to_thread(file.read)
+            return await default_ocr_service.process_whole_document(
+                pdf_document=pdf_bytes, route_path=route_path, llm_config=llm_config
+            )
+
+        if executor is None:
+            pdf_pages = await asyncio.to_thread(prepare_pdf_pages, file)
+        else:
+            # A large upload is spooled to disk, so read it off the event loop
+            file.seek(0)
+            pdf_bytes = await asyncio.to_thread(file.read)
+            pdf_pages = await asyncio.get_running_loop().run_in_executor(
+                executor, prepare_pdf_bytes, pdf_bytes
+            )
 
         # Process all pages with the OCR service
         return await default_ocr_service.process_document(
-            pdf_pages=pdf_pages, route_path=route_path
+            pdf_pages=pdf_pages, route_path=route_path, llm_config=llm_config
         )
-    except PDFProcessingError:
-        # Re-raise PDF processing errors
+    except (PDFProcessingError, BrokenProcessPool):
+        # Re-raise PDF processing errors; a broken pool is a server fault, not
+        # a bad upload
         raise
     except Exception as e:
         # Wrap other exceptions in PDFProcessingError
-        raise PDFProcessingError(f"Error processing PDF: {str(e)}")
+        raise PDFProcessingError(f"Error processing PDF: {str(e)}") from e
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 from uuid import UUID
 
 import aiosqlite
@@ -6,7 +6,7 @@ from fastapi import HTTPException, status
 
 from app.repositories import timesheet_repository
 from app.schemas.timesheet import TimesheetCreate, TimesheetUpdate
-from app.services.employee_service import get_employee
+from app.services.employee_service import ensure_employee_exists
 
 
 async def get_employee_timesheets(
@@ -25,10 +25,39 @@ async def get_employee_timesheets(
     Raises:
         HTTPException: If employee not found
     """
-    # Verify employee exists
-    await get_employee(conn, employee_uuid)
+    timesheets = await timesheet_repository.get_timesheets_by_employee(
+        conn, employee_uuid
+    )
+
+    # An empty list may mean the employee itself is missing
+    if not timesheets:
+        await ensure_employee_exists(conn, employee_uuid)
+
+    return timesheets
+
+
+async def iter_employee_timesheets(
+    conn: aiosqlite.Connection, employee_uuid: UUID
+) -> AsyncIterator[Dict]:
+    """
+    Get an iterator over all timesheets for an employee.
+
+    The employee is checked up front so a missing employee is reported before
+    any timesheet is streamed.
+
+    Args:
+        conn: Database connection
+        employee_uuid: Employee UUID
+
+    Returns:
+        Async iterator of timesheet records
 
-    return await timesheet_repository.get_timesheets_by_employee(conn, employee_uuid)
+    Raises:
+        HTTPException: If employee not found
+    """
+    await ensure_employee_exists(conn, employee_uuid)
+
+    return timesheet_repository.iter_timesheets_by_employee(conn, employee_uuid)
 
 
 async def get_employee_timesheet(
@@ -49,13 +78,12 @@ async def get_employee_timesheet(
     Raises:
         HTTPException: If employee or timesheet not found
     """
-    # Verify employee exists
-    await get_employee(conn, employee_uuid)
-
     timesheet = await timesheet_repository.get_timesheet(
         conn, employee_uuid, year, month
     )
     if not timesheet:
+        # Tell a missing employee apart from a missing month only on a miss
+        await ensure_employee_exists(conn, employee_uuid)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Timesheet for employee {employee_uuid}, year {year}, month {month} not found",
@@ -81,20 +109,65 @@ async def create_employee_timesheet(
     Raises:
         HTTPException: If employee not found or timesheet already exists
     """
-    # Verify employee exists
-    await get_employee(conn, employee_uuid)
-
-    # Check if timesheet already exists
-    existing_timesheet = await timesheet_repository.get_timesheet(
-        conn, employee_uuid, timesheet.year, timesheet.month
-    )
-    if existing_timesheet:
+    # The insert is skipped, rather than failing, if the month already exists
+    try:
+        created_timesheet = await timesheet_repository.create_timesheet(
+            conn, employee_uuid, timesheet
+        )
+    except aiosqlite.IntegrityError as e:
+        # The schema validates every column, so this is most likely the
+        # employee foreign key; report that as a missing employee, and any
+        # other constraint failure as a conflict
+        await ensure_employee_exists(conn, employee_uuid)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"Timesheet for employee {employee_uuid}, year {timesheet.year}, "
+                f"month {timesheet.month} conflicts with existing data"
+            ),
+        ) from e
+    if created_timesheet is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Timesheet for employee {employee_uuid}, year {timesheet.year}, month {timesheet.month} already exists",
         )
 
-    return await timesheet_repository.create_timesheet(conn, employee_uuid, timesheet)
+    return created_timesheet
+
+
+async def create_employee_timesheets(
+    conn: aiosqlite.Connection, employee_uuid: UUID, timesheets: List[TimesheetCreate]
+) -> List[Dict]:
+    """
+    Create several timesheets for an employee in one batch.
+
+    Args:
+        conn: Database connection
+        employee_uuid: Employee UUID
+        timesheets: Timesheet data for each month to create
+
+    Returns:
+        Created timesheet records, in the order given
+
+    Raises:
+        HTTPException: If employee not found or any timesheet already exists
+    """
+    if not timesheets:
+        await ensure_employee_exists(conn, employee_uuid)
+        return []
+
+    try:
+        return await timesheet_repository.bulk_create_timesheets(
+            conn, employee_uuid, timesheets
+        )
+    except aiosqlite.IntegrityError as e:
+        await conn.rollback()
+        # A missing employee fails the foreign key rather than the month check
+        await ensure_employee_exists(conn, employee_uuid)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"One or more timesheets for employee {employee_uuid} already exist",
+        ) from e
 
 
 async def update_employee_timesheet(
@@ -120,18 +193,17 @@ async def update_employee_timesheet(
     Raises:
         HTTPException: If employee or timesheet not found
     """
-    # Verify employee exists
-    await get_employee(conn, employee_uuid)
-
-    # Verify timesheet exists
-    await get_employee_timesheet(conn, employee_uuid, year, month)
+    # Nothing to change, so answer with the current record
+    if not timesheet.model_dump(exclude_none=True):
+        return await get_employee_timesheet(conn, employee_uuid, year, month)
 
-    # Update timesheet
+    # Update timesheet; RETURNING yields no row if the timesheet is missing
     updated_timesheet = await timesheet_repository.update_timesheet(
         conn, employee_uuid, year, month, timesheet
     )
 
     if not updated_timesheet:
+        await ensure_employee_exists(conn, employee_uuid)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Timesheet for employee {employee_uuid}, year {year}, month {month} not found",
@@ -155,17 +227,12 @@ async def delete_employee_timesheet(
     Raises:
         HTTPException: If employee or timesheet not found
     """
-    # Verify employee exists
-    await get_employee(conn, employee_uuid)
-
-    # Verify timesheet exists
-    await get_employee_timesheet(conn, employee_uuid, year, month)
-
-    # Delete timesheet
+    # Delete timesheet; the employee is only checked if nothing was deleted
     deleted = await timesheet_repository.delete_timesheet(
         conn, employee_uuid, year, month
     )
     if not deleted:
+        await ensure_employee_exists(conn, employee_uuid)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Timesheet for employee {employee_uuid}, year {year}, month {month} not found",
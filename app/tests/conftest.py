@@ -1,11 +1,14 @@
 import uuid
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import aiosqlite
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
-from app.database import get_db
+from app.database import get_reader, get_reader_factory, get_writer
 
 
 @pytest.fixture
@@ -14,10 +17,19 @@ def test_client():
     return TestClient(app)
 
 
+@pytest.fixture
+async def async_client():
+    """Async test client that calls the app on the test's own event loop."""
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
 @pytest.fixture
 def mock_db_conn():
-    """Mock database connection."""
-    conn = AsyncMock()
+    """Mock database connection, specced so calls must match aiosqlite's API."""
+    conn = AsyncMock(spec=aiosqlite.Connection)
     # Configure the mock to handle the dict conversion properly
     cursor_mock = AsyncMock()
     cursor_mock.fetchone.return_value = None
@@ -52,7 +64,14 @@ def mock_timesheet_data():
 
 @pytest.fixture
 def override_get_db(mock_db_conn):
-    """Override the get_db dependency."""
-    app.dependency_overrides[get_db] = lambda: mock_db_conn
+    """Override the reader and writer database dependencies."""
+
+    @asynccontextmanager
+    async def borrow_reader():
+        yield mock_db_conn
+
+    app.dependency_overrides[get_reader] = lambda: mock_db_conn
+    app.dependency_overrides[get_reader_factory] = lambda: borrow_reader
+    app.dependency_overrides[get_writer] = lambda: mock_db_conn
     yield
     app.dependency_overrides = {}
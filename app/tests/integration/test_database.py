@@ -0,0 +1,105 @@
+import uuid
+
+import aiosqlite
+import pytest
+
+from app.database import (
+    CREATE_EMPLOYEES_TABLE,
+    CREATE_TIMESHEETS_TABLE,
+    _migrate_text_uuids,
+)
+from app.repositories.timesheet_repository import bulk_create_timesheets
+from app.schemas.timesheet import TimesheetCreate
+
+LEGACY_SCHEMA = """
+CREATE TABLE employees (
+    uuid TEXT PRIMARY KEY,
+    staff_code TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE timesheets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_uuid TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    total_working_days INTEGER NOT NULL,
+    total_ot_hours REAL NOT NULL,
+    total_sundays_worked INTEGER NOT NULL,
+    total_ot_hours_on_sundays REAL NOT NULL,
+    FOREIGN KEY (employee_uuid) REFERENCES employees (uuid) ON DELETE CASCADE,
+    UNIQUE (employee_uuid, year, month)
+);
+"""
+
+
+@pytest.mark.asyncio
+async def test_migrate_text_uuids(tmp_path):
+    """Test that TEXT uuids from an old database are rewritten as BLOBs."""
+    employee_uuid = uuid.uuid4()
+
+    async with aiosqlite.connect(tmp_path / "legacy.db") as conn:
+        await conn.executescript(LEGACY_SCHEMA)
+        await conn.execute(
+            "INSERT INTO employees VALUES (?, 'EMP001', 'John Doe')",
+            (str(employee_uuid),),
+        )
+        await conn.execute(
+            "INSERT INTO timesheets VALUES (7, ?, 2024, 1, 20, 5.0, 2, 1.5)",
+            (str(employee_uuid),),
+        )
+        await conn.commit()
+
+        await _migrate_text_uuids(conn)
+        # A second run is a no-op once the schema has been migrated
+        await _migrate_text_uuids(conn)
+
+        async with conn.execute(
+            "SELECT type FROM pragma_table_info('timesheets') "
+            "WHERE name = 'employee_uuid'"
+        ) as cursor:
+            assert (await cursor.fetchone())[0] == "BLOB"
+
+        async with conn.execute("SELECT uuid, staff_code FROM employees") as cursor:
+            assert await cursor.fetchall() == [(employee_uuid.bytes, "EMP001")]
+
+        async with conn.execute("SELECT id, employee_uuid FROM timesheets") as cursor:
+            assert await cursor.fetchall() == [(7, employee_uuid.bytes)]
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_timesheets_returns_rows_in_input_order(tmp_path):
+    """Test that a batch insert returns only the new rows, in input order."""
+    employee_uuid = uuid.uuid4()
+
+    async with aiosqlite.connect(tmp_path / "test.db", isolation_level=None) as conn:
+        conn.row_factory = aiosqlite.Row
+        await conn.execute(CREATE_EMPLOYEES_TABLE)
+        await conn.execute(CREATE_TIMESHEETS_TABLE)
+        await conn.execute(
+            "INSERT INTO employees VALUES (?, 'EMP001', 'John Doe')",
+            (employee_uuid.bytes,),
+        )
+        await conn.execute(
+            "INSERT INTO timesheets VALUES (NULL, ?, 2025, 2, 20, 5.0, 2, 1.5)",
+            (employee_uuid.bytes,),
+        )
+
+        items = [
+            TimesheetCreate(
+                year=year,
+                month=month,
+                total_working_days=20,
+                total_ot_hours=0.0,
+                total_sundays_worked=0,
+                total_ot_hours_on_sundays=0.0,
+            )
+            for year, month in [(2024, 12), (2025, 3), (2025, 1)]
+        ]
+        created = await bulk_create_timesheets(conn, employee_uuid, items)
+
+    assert [(row["year"], row["month"]) for row in created] == [
+        (2024, 12),
+        (2025, 3),
+        (2025, 1),
+    ]
+    assert all(row["employee_uuid"] == employee_uuid for row in created)
@@ -0,0 +1,100 @@
+import aiosqlite
+import pytest
+
+from app.database import CONNECTION_PRAGMAS
+from app.db_pool import AioSqlitePool
+
+
+@pytest.fixture
+async def db_pool(tmp_path):
+    """Open a pool against a temporary database file."""
+    pool = AioSqlitePool(
+        str(tmp_path / "test.db"), readers=2, pragmas=CONNECTION_PRAGMAS
+    )
+    await pool.open()
+    async with pool.writer() as conn:
+        await conn.execute("CREATE TABLE items (name TEXT NOT NULL)")
+        await conn.commit()
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_readers_see_committed_writes(db_pool):
+    """Test that reader connections observe data committed by the writer."""
+    async with db_pool.writer() as conn:
+        await conn.execute("INSERT INTO items (name) VALUES ('a')")
+        await conn.commit()
+
+    async with db_pool.reader() as conn:
+        async with conn.execute("SELECT name FROM items") as cursor:
+            rows = await cursor.fetchall()
+
+    assert [dict(row) for row in rows] == [{"name": "a"}]
+
+
+@pytest.mark.asyncio
+async def test_single_statement_writes_autocommit(db_pool):
+    """Test that a single write is visible to readers without an explicit commit."""
+    async with db_pool.writer() as conn:
+        await conn.execute("INSERT INTO items (name) VALUES ('a')")
+        assert not conn.in_transaction
+
+    async with db_pool.reader() as conn:
+        async with conn.execute("SELECT COUNT(*) FROM items") as cursor:
+            row = await cursor.fetchone()
+
+    assert row[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_rolls_back_uncommitted_work(db_pool):
+    """Test that an uncommitted write is not leaked to the next borrower."""
+    with pytest.raises(RuntimeError):
+        async with db_pool.writer() as conn:
+            await conn.execute("BEGIN")
+            await conn.execute("INSERT INTO items (name) VALUES ('a')")
+            raise RuntimeError("boom")
+
+    async with db_pool.writer() as conn:
+        assert not conn.in_transaction
+        async with conn.execute("SELECT COUNT(*) FROM items") as cursor:
+            row = await cursor.fetchone()
+
+    assert row[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_readers_are_read_only(db_pool):
+    """Test that reader connections cannot modify the database."""
+    async with db_pool.reader() as conn:
+        with pytest.raises(aiosqlite.OperationalError):
+            await conn.execute("INSERT INTO items (name) VALUES ('a')")
+
+
+@pytest.mark.asyncio
+async def test_reader_is_returned_to_pool(db_pool):
+    """Test that borrowed readers are returned to the queue."""
+    async with db_pool.reader():
+        assert db_pool.readers.qsize() == 1
+
+    assert db_pool.readers.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_foreign_keys_are_enforced(db_pool):
+    """Test that ON DELETE CASCADE applies on pooled connections."""
+    async with db_pool.writer() as conn:
+        await conn.executescript("""
+            CREATE TABLE parents (id INTEGER PRIMARY KEY);
+            CREATE TABLE children (
+                parent_id INTEGER REFERENCES parents (id) ON DELETE CASCADE
+            );
+            INSERT INTO parents VALUES (1);
+            INSERT INTO children VALUES (1);
+            """)
+        await conn.execute("DELETE FROM parents WHERE id = 1")
+        async with conn.execute("SELECT COUNT(*) FROM children") as cursor:
+            row = await cursor.fetchone()
+
+    assert row[0] == 0
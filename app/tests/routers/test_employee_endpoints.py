@@ -4,15 +4,16 @@ from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi import HTTPException
-from fastapi.testclient import TestClient
 
-from app.main import app
+from app.routers.employee_routes import employee_response_cache
 
 
-@pytest.fixture
-def test_client():
-    """Test client fixture."""
-    return TestClient(app)
+@pytest.fixture(autouse=True)
+def clear_employee_response_cache():
+    """Start every test with an empty employee response cache."""
+    employee_response_cache.clear()
+    yield
+    employee_response_cache.clear()
 
 
 @pytest.fixture
@@ -29,7 +30,7 @@ def mock_employee_uuid():
 
 @pytest.mark.asyncio
 async def test_create_employee_success(
-    test_client, mock_employee_data, override_get_db
+    async_client, mock_employee_data, override_get_db
 ):
     """Test successful employee creation."""
     # Mock the create_employee function
@@ -45,7 +46,7 @@ async def test_create_employee_success(
         }
 
         # Make the request
-        response = test_client.post("/employees", json=mock_employee_data)
+        response = await async_client.post("/employees", json=mock_employee_data)
 
         # Check response
         assert response.status_code == 201
@@ -55,9 +56,35 @@ async def test_create_employee_success(
         assert data["name"] == mock_employee_data["name"]
 
 
+@pytest.mark.asyncio
+async def test_create_employee_strips_whitespace(async_client, override_get_db):
+    """Test that staff code and name are stripped, and blank values rejected."""
+    with patch(
+        "app.routers.employee_routes.employee_service.create_employee"
+    ) as mock_create:
+        mock_create.return_value = {
+            "uuid": str(uuid.uuid4()),
+            "staff_code": "EMP001",
+            "name": "John Doe",
+        }
+
+        response = await async_client.post(
+            "/employees", json={"staff_code": " EMP001 ", "name": "John Doe\n"}
+        )
+        assert response.status_code == 201
+        employee = mock_create.call_args.args[1]
+        assert employee.staff_code == "EMP001"
+        assert employee.name == "John Doe"
+
+        response = await async_client.post(
+            "/employees", json={"staff_code": "   ", "name": "John Doe"}
+        )
+        assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_create_employee_duplicate(
-    test_client, mock_employee_data, override_get_db
+    async_client, mock_employee_data, override_get_db
 ):
     """Test employee creation with duplicate staff code."""
     # Mock the create_employee function to raise conflict error
@@ -68,7 +95,7 @@ async def test_create_employee_duplicate(
         ),
     ):
         # Make the request
-        response = test_client.post("/employees", json=mock_employee_data)
+        response = await async_client.post("/employees", json=mock_employee_data)
 
         # Check response
         assert response.status_code == 409
@@ -76,7 +103,7 @@ async def test_create_employee_duplicate(
 
 
 @pytest.mark.asyncio
-async def test_get_all_employees(test_client, override_get_db):
+async def test_get_all_employees(async_client, override_get_db):
     """Test getting all employees."""
     # Mock the get_all_employees function
     with patch(
@@ -89,7 +116,7 @@ async def test_get_all_employees(test_client, override_get_db):
         ]
 
         # Make the request
-        response = test_client.get("/employees")
+        response = await async_client.get("/employees")
 
         # Check response
         assert response.status_code == 200
@@ -100,7 +127,97 @@ async def test_get_all_employees(test_client, override_get_db):
 
 
 @pytest.mark.asyncio
-async def test_get_employee_by_uuid(test_client, mock_employee_uuid, override_get_db):
+async def test_get_all_employees_compressed(async_client, override_get_db):
+    """Test that large lists are gzip-compressed when the client accepts it."""
+    with patch(
+        "app.routers.employee_routes.employee_service.get_all_employees"
+    ) as mock_get_all:
+        mock_get_all.return_value = [
+            {"uuid": str(uuid.uuid4()), "staff_code": f"EMP{i:03}", "name": "John Doe"}
+            for i in range(50)
+        ]
+
+        response = await async_client.get(
+            "/employees", headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 50
+
+
+@pytest.mark.asyncio
+async def test_get_all_employees_cached(async_client, override_get_db):
+    """Test that repeated reads are cached and honour If-None-Match."""
+    with patch(
+        "app.routers.employee_routes.employee_service.get_all_employees"
+    ) as mock_get_all:
+        mock_get_all.return_value = [
+            {"uuid": str(uuid.uuid4()), "staff_code": "EMP001", "name": "John Doe"}
+        ]
+
+        first = await async_client.get("/employees")
+        etag = first.headers["etag"]
+
+        # A second read is served from the cache
+        second = await async_client.get("/employees")
+        assert second.json() == first.json()
+        mock_get_all.assert_called_once()
+
+        # A client holding the current ETag gets an empty 304
+        not_modified = await async_client.get(
+            "/employees", headers={"If-None-Match": etag}
+        )
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+
+@pytest.mark.asyncio
+async def test_employee_cache_cleared_on_change(
+    async_client, mock_employee_data, override_get_db
+):
+    """Test that creating an employee invalidates cached reads."""
+    with (
+        patch(
+            "app.routers.employee_routes.employee_service.get_all_employees"
+        ) as mock_get_all,
+        patch(
+            "app.routers.employee_routes.employee_service.create_employee"
+        ) as mock_create,
+    ):
+        mock_get_all.return_value = []
+        mock_create.return_value = {"uuid": str(uuid.uuid4()), **mock_employee_data}
+
+        await async_client.get("/employees")
+        await async_client.post("/employees", json=mock_employee_data)
+        await async_client.get("/employees")
+
+        assert mock_get_all.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_employee_cache_skips_result_read_before_change(
+    async_client, override_get_db
+):
+    """Test that a read overtaken by a write isn't cached."""
+
+    async def read_then_change(conn):
+        # A write commits and clears the cache while this read is running
+        employee_response_cache.clear()
+        return []
+
+    with patch(
+        "app.routers.employee_routes.employee_service.get_all_employees",
+        side_effect=read_then_change,
+    ):
+        response = await async_client.get("/employees")
+
+    assert response.status_code == 200
+    assert len(employee_response_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_employee_by_uuid(async_client, mock_employee_uuid, override_get_db):
     """Test getting a specific employee by UUID."""
     # Mock the get_employee function
     with patch("app.routers.employee_routes.employee_service.get_employee") as mock_get:
@@ -112,7 +229,7 @@ async def test_get_employee_by_uuid(test_client, mock_employee_uuid, override_ge
         }
 
         # Make the request
-        response = test_client.get(f"/employees/{mock_employee_uuid}")
+        response = await async_client.get(f"/employees/{mock_employee_uuid}")
 
         # Check response
         assert response.status_code == 200
@@ -123,7 +240,9 @@ async def test_get_employee_by_uuid(test_client, mock_employee_uuid, override_ge
 
 
 @pytest.mark.asyncio
-async def test_get_employee_not_found(test_client, mock_employee_uuid, override_get_db):
+async def test_get_employee_not_found(
+    async_client, mock_employee_uuid, override_get_db
+):
     """Test getting a non-existent employee."""
     # Mock the get_employee function to raise not found error
     with patch(
@@ -131,7 +250,7 @@ async def test_get_employee_not_found(test_client, mock_employee_uuid, override_
         side_effect=HTTPException(status_code=404, detail="Employee not found"),
     ):
         # Make the request
-        response = test_client.get(f"/employees/{mock_employee_uuid}")
+        response = await async_client.get(f"/employees/{mock_employee_uuid}")
 
         # Check response
         assert response.status_code == 404
@@ -139,7 +258,17 @@ async def test_get_employee_not_found(test_client, mock_employee_uuid, override_
 
 
 @pytest.mark.asyncio
-async def test_update_employee(test_client, mock_employee_uuid, override_get_db):
+async def test_get_employee_malformed_uuid(async_client, override_get_db):
+    """Test that a malformed UUID is rejected before reaching the service."""
+    with patch("app.routers.employee_routes.employee_service.get_employee") as mock_get:
+        response = await async_client.get(f"/employees/{'-' * 36}")
+
+        assert response.status_code == 422
+        mock_get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_update_employee(async_client, mock_employee_uuid, override_get_db):
     """Test updating an employee."""
     # Mock the update_employee function
     with patch(
@@ -154,7 +283,9 @@ async def test_update_employee(test_client, mock_employee_uuid, override_get_db)
 
         # Make the request
         update_data = {"staff_code": "EMP001-UPDATED", "name": "John Doe Updated"}
-        response = test_client.put(f"/employees/{mock_employee_uuid}", json=update_data)
+        response = await async_client.put(
+            f"/employees/{mock_employee_uuid}", json=update_data
+        )
 
         # Check response
         assert response.status_code == 200
@@ -165,14 +296,14 @@ async def test_update_employee(test_client, mock_employee_uuid, override_get_db)
 
 
 @pytest.mark.asyncio
-async def test_delete_employee(test_client, mock_employee_uuid, override_get_db):
+async def test_delete_employee(async_client, mock_employee_uuid, override_get_db):
     """Test deleting an employee."""
     # Mock the delete_employee function
     with patch(
         "app.routers.employee_routes.employee_service.delete_employee"
     ) as mock_delete:
         # Make the request
-        response = test_client.delete(f"/employees/{mock_employee_uuid}")
+        response = await async_client.delete(f"/employees/{mock_employee_uuid}")
 
         # Check response
         assert response.status_code == 204
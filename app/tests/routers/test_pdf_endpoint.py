@@ -1,11 +1,15 @@
+import asyncio
 import io
 import json
-from unittest.mock import AsyncMock, patch
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.routers.ocr_routes import pdf_result_cache
 from app.services.pdf_service import PDFProcessingError
 
 
@@ -15,6 +19,14 @@ def test_client():
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_pdf_result_cache():
+    """Start every test with an empty OCR result cache."""
+    pdf_result_cache.clear()
+    yield
+    pdf_result_cache.clear()
+
+
 @pytest.fixture
 def mock_pdf_file():
     """Mock PDF file."""
@@ -68,6 +80,10 @@ async def test_process_pdf_success(test_client, mock_pdf_file):
         assert data["pages"][1]["page_number"] == 2
         assert data["pages"][1]["data"]["author"] == "John Doe"
 
+        # The spooled upload is passed through rather than copied into memory
+        uploaded_file = mock_process.call_args.kwargs["file"]
+        assert not isinstance(uploaded_file, io.BytesIO)
+
 
 @pytest.mark.asyncio
 async def test_process_pdf_with_llm_config(test_client, mock_pdf_file):
@@ -116,6 +132,12 @@ async def test_process_pdf_with_llm_config(test_client, mock_pdf_file):
         assert len(data["pages"]) == 1
         assert data["pages"][0]["data"]["custom_field"] == "Custom value"
 
+        # The custom config is passed per call instead of mutating the manager
+        mock_register_config.assert_not_called()
+        passed_config = mock_process.call_args.kwargs["llm_config"]
+        assert passed_config.provider == "anthropic"
+        assert passed_config.temperature == 0.2
+
 
 @pytest.mark.asyncio
 async def test_process_pdf_invalid_file_type(test_client):
@@ -130,11 +152,25 @@ async def test_process_pdf_invalid_file_type(test_client):
     )
 
     # Check response
-    assert response.status_code == 400
+    assert response.status_code == 415
     assert "detail" in response.json()
     assert "must be a PDF" in response.json()["detail"]
 
 
+@pytest.mark.asyncio
+async def test_process_pdf_invalid_file_type_after_large_field(test_client):
+    """Test that the route still rejects non-PDFs the middleware cannot see."""
+    # A large form field pushes the file part past the inspected bytes
+    response = test_client.post(
+        "/ocr/pdf",
+        data={"llm_config_data": "{}" + " " * 8192},
+        files={"file": ("test.txt", io.BytesIO(b"not a PDF"), "text/plain")},
+    )
+
+    assert response.status_code == 415
+    assert "must be a PDF" in response.json()["detail"]
+
+
 @pytest.mark.asyncio
 async def test_process_pdf_processing_error(test_client, mock_pdf_file):
     """Test PDF processing with processing error."""
@@ -158,6 +194,32 @@ async def test_process_pdf_processing_error(test_client, mock_pdf_file):
         assert "Test error" in response.json()["detail"]
 
 
+@pytest.mark.asyncio
+async def test_process_pdf_broken_pool(test_client, mock_pdf_file):
+    """Test that a dead OCR worker returns 503 and the pool is replaced."""
+    broken_pool = MagicMock()
+    fresh_pool = MagicMock()
+    app.state.ocr_pool = broken_pool
+    try:
+        with (
+            patch(
+                "app.routers.ocr_routes.process_pdf",
+                side_effect=BrokenProcessPool("worker died"),
+            ),
+            patch("app.services.executors.create_ocr_pool", return_value=fresh_pool),
+        ):
+            response = test_client.post(
+                "/ocr/pdf",
+                files={"file": ("test.pdf", mock_pdf_file, "application/pdf")},
+            )
+
+        assert response.status_code == 503
+        assert app.state.ocr_pool is fresh_pool
+        broken_pool.shutdown.assert_called_once()
+    finally:
+        del app.state.ocr_pool
+
+
 @pytest.mark.asyncio
 async def test_process_pdf_invalid_llm_config(test_client, mock_pdf_file):
     """Test PDF processing with invalid LLM configuration."""
@@ -176,3 +238,66 @@ async def test_process_pdf_invalid_llm_config(test_client, mock_pdf_file):
     assert response.status_code == 400
     assert "detail" in response.json()
     assert "Invalid LLM configuration" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_cached_result(test_client, mock_pdf_file):
+    """Test that an identical upload is served from the OCR result cache."""
+    with patch("app.routers.ocr_routes.process_pdf") as mock_process:
+        mock_process.return_value = [{"page_number": 1, "data": {"name": "A"}}]
+
+        # Upload the same bytes twice
+        for _ in range(2):
+            response = test_client.post(
+                "/ocr/pdf",
+                files={"file": ("test.pdf", mock_pdf_file, "application/pdf")},
+            )
+            assert response.status_code == 200
+            assert response.json()["pages"][0]["data"] == {"name": "A"}
+
+        # Only the first upload reaches the OCR pipeline
+        mock_process.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_empty_result_not_cached(test_client, mock_pdf_file):
+    """Test that failed extractions are not cached."""
+    with patch("app.routers.ocr_routes.process_pdf") as mock_process:
+        mock_process.return_value = [{"page_number": 1, "data": {}}]
+
+        for _ in range(2):
+            test_client.post(
+                "/ocr/pdf",
+                files={"file": ("test.pdf", mock_pdf_file, "application/pdf")},
+            )
+
+        assert mock_process.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_concurrent_uploads_coalesced(mock_pdf_file):
+    """Test that identical uploads in flight together share one OCR run."""
+
+    async def slow_process_pdf(**kwargs):
+        await asyncio.sleep(0.05)
+        return [{"page_number": 1, "data": {"name": "A"}}]
+
+    with patch(
+        "app.routers.ocr_routes.process_pdf", side_effect=slow_process_pdf
+    ) as mock_process:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post(
+                        "/ocr/pdf",
+                        files={"file": ("test.pdf", mock_pdf_file, "application/pdf")},
+                    )
+                    for _ in range(3)
+                )
+            )
+
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert all(r.json()["pages"][0]["data"] == {"name": "A"} for r in responses)
+        mock_process.assert_called_once()
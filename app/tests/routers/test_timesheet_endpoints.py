@@ -163,6 +163,65 @@ async def test_get_all_timesheets(test_client, mock_employee_uuid, override_get_
         assert data[1]["month"] == 6
 
 
+@pytest.mark.asyncio
+async def test_stream_timesheets(
+    test_client, mock_employee_uuid, mock_timesheet_data, override_get_db
+):
+    """Test streaming an employee's timesheets as NDJSON."""
+
+    async def timesheets():
+        for month in (6, 5):
+            yield {
+                "id": month,
+                "employee_uuid": mock_employee_uuid,
+                **mock_timesheet_data,
+                "month": month,
+            }
+
+    # Mock the iter_employee_timesheets function
+    with patch(
+        "app.routers.timesheet_routes.timesheet_service.iter_employee_timesheets",
+        new=AsyncMock(return_value=timesheets()),
+    ):
+        # Make the request
+        response = test_client.get(f"/employees/{mock_employee_uuid}/timesheets/stream")
+
+        # Check response
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["month"] for line in lines] == [6, 5]
+        assert lines[0]["employee_uuid"] == mock_employee_uuid
+
+
+@pytest.mark.asyncio
+async def test_create_timesheets_bulk(
+    test_client, mock_employee_uuid, mock_timesheet_data, override_get_db
+):
+    """Test creating several timesheets in one request."""
+    # Mock the create_employee_timesheets function
+    with patch(
+        "app.routers.timesheet_routes.timesheet_service.create_employee_timesheets"
+    ) as mock_create:
+        second_month = {**mock_timesheet_data, "month": 7}
+        mock_create.return_value = [
+            {"id": 1, "employee_uuid": mock_employee_uuid, **mock_timesheet_data},
+            {"id": 2, "employee_uuid": mock_employee_uuid, **second_month},
+        ]
+
+        # Make the request
+        response = test_client.post(
+            f"/employees/{mock_employee_uuid}/timesheets/bulk",
+            json=[mock_timesheet_data, second_month],
+        )
+
+        # Check response
+        assert response.status_code == 201
+        data = response.json()
+        assert [item["month"] for item in data] == [6, 7]
+        assert len(mock_create.call_args.args[2]) == 2
+
+
 @pytest.mark.asyncio
 async def test_get_specific_timesheet(
     test_client, mock_employee_uuid, mock_timesheet_data, override_get_db
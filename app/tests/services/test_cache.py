@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from app.services.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test that the oldest untouched entry is evicted when full."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expires_entries():
+    """Test that entries are dropped once their TTL has passed."""
+    cache = TTLCache(maxsize=2, ttl=10)
+
+    with patch("app.services.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+
+    with patch("app.services.cache.time.monotonic", return_value=105.0):
+        assert cache.get("a") == 1
+
+    with patch("app.services.cache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+def test_ttl_cache_clear_starts_new_generation():
+    """Test that clear() bumps the generation used to detect stale values."""
+    cache = TTLCache()
+    generation = cache.generation
+
+    cache.set("a", 1)
+    cache.clear()
+
+    assert cache.generation == generation + 1
+    assert cache.get("a") is None
@@ -1,6 +1,7 @@
 import uuid
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import patch
 
+import aiosqlite
 import pytest
 from fastapi import HTTPException
 
@@ -8,12 +9,6 @@ from app.services import employee_service
 from app.schemas.employee import EmployeeCreate, EmployeeUpdate
 
 
-@pytest.fixture
-def mock_db_conn():
-    """Mock database connection."""
-    return MagicMock()
-
-
 @pytest.fixture
 def mock_employee_data():
     """Sample employee data."""
@@ -81,15 +76,8 @@ async def test_get_employee_not_found(mock_db_conn):
 async def test_create_employee_success(mock_db_conn):
     """Test creating an employee successfully."""
     # Mock the repository functions
-    with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_staff_code"
-        ) as mock_get,
-        patch("app.repositories.employee_repository.create_employee") as mock_create,
-    ):
+    with patch("app.repositories.employee_repository.create_employee") as mock_create:
         # Set up mock return values
-        mock_get.return_value = None  # No existing employee with same staff code
-
         created_employee = {
             "uuid": str(uuid.uuid4()),
             "staff_code": "EMP001",
@@ -105,7 +93,6 @@ async def test_create_employee_success(mock_db_conn):
 
         # Verify result
         assert result == created_employee
-        mock_get.assert_called_once_with(mock_db_conn, "EMP001")
         mock_create.assert_called_once_with(mock_db_conn, employee_data)
 
 
@@ -113,16 +100,9 @@ async def test_create_employee_success(mock_db_conn):
 async def test_create_employee_duplicate(mock_db_conn):
     """Test creating an employee with duplicate staff code."""
     # Mock the repository function
-    with patch(
-        "app.repositories.employee_repository.get_employee_by_staff_code"
-    ) as mock_get:
-        # Set up mock return value - employee with same staff code exists
-        existing_employee = {
-            "uuid": str(uuid.uuid4()),
-            "staff_code": "EMP001",
-            "name": "Existing Employee",
-        }
-        mock_get.return_value = existing_employee
+    with patch("app.repositories.employee_repository.create_employee") as mock_create:
+        # The insert is skipped because the staff code is taken
+        mock_create.return_value = None
 
         # Create employee data
         employee_data = EmployeeCreate(staff_code="EMP001", name="John Doe")
@@ -140,19 +120,8 @@ async def test_create_employee_duplicate(mock_db_conn):
 async def test_update_employee_success(mock_db_conn, mock_employee_data):
     """Test updating an employee successfully."""
     # Mock the repository functions
-    with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_uuid,
-        patch(
-            "app.repositories.employee_repository.get_employee_by_staff_code"
-        ) as mock_get_staff,
-        patch("app.repositories.employee_repository.update_employee") as mock_update,
-    ):
+    with patch("app.repositories.employee_repository.update_employee") as mock_update:
         # Set up mock return values
-        mock_get_uuid.return_value = mock_employee_data
-        mock_get_staff.return_value = None  # No other employee with same staff code
-
         updated_employee = {
             "uuid": mock_employee_data["uuid"],
             "staff_code": "EMP001-UPDATED",
@@ -173,34 +142,38 @@ async def test_update_employee_success(mock_db_conn, mock_employee_data):
 
         # Verify result
         assert result == updated_employee
-        mock_get_uuid.assert_called_once_with(mock_db_conn, employee_uuid)
-        mock_get_staff.assert_called_once_with(mock_db_conn, "EMP001-UPDATED")
         mock_update.assert_called_once_with(mock_db_conn, employee_uuid, update_data)
 
 
 @pytest.mark.asyncio
-async def test_update_employee_duplicate_staff_code(mock_db_conn, mock_employee_data):
-    """Test updating an employee with a staff code that belongs to another employee."""
-    # Mock the repository functions
+async def test_update_employee_empty_payload(mock_db_conn, mock_employee_data):
+    """Test that an empty update returns the current record without an UPDATE."""
     with (
         patch(
             "app.repositories.employee_repository.get_employee_by_uuid"
         ) as mock_get_uuid,
-        patch(
-            "app.repositories.employee_repository.get_employee_by_staff_code"
-        ) as mock_get_staff,
+        patch("app.repositories.employee_repository.update_employee") as mock_update,
     ):
-        # Set up mock return values
         mock_get_uuid.return_value = mock_employee_data
 
-        # Another employee with the staff code we want to use
-        other_employee = {
-            "uuid": str(uuid.uuid4()),  # Different UUID
-            "staff_code": "EMP002",
-            "name": "Other Employee",
-        }
-        mock_get_staff.return_value = other_employee
+        employee_uuid = uuid.UUID(mock_employee_data["uuid"])
+        result = await employee_service.update_employee(
+            mock_db_conn, employee_uuid, EmployeeUpdate()
+        )
+
+        assert result == mock_employee_data
+        mock_get_uuid.assert_called_once_with(mock_db_conn, employee_uuid)
+        mock_update.assert_not_called()
 
+
+@pytest.mark.asyncio
+async def test_update_employee_duplicate_staff_code(mock_db_conn, mock_employee_data):
+    """Test updating an employee with a staff code that belongs to another employee."""
+    # The UNIQUE constraint on staff_code rejects the update
+    with patch(
+        "app.repositories.employee_repository.update_employee",
+        side_effect=aiosqlite.IntegrityError("UNIQUE constraint failed"),
+    ):
         # Update data with conflicting staff code
         employee_uuid = uuid.UUID(mock_employee_data["uuid"])
         update_data = EmployeeUpdate(
@@ -218,16 +191,29 @@ async def test_update_employee_duplicate_staff_code(mock_db_conn, mock_employee_
         assert "already exists" in str(excinfo.value.detail)
 
 
+@pytest.mark.asyncio
+async def test_update_employee_not_found(mock_db_conn, mock_employee_data):
+    """Test updating an employee that does not exist."""
+    with patch("app.repositories.employee_repository.update_employee") as mock_update:
+        # RETURNING produced no row
+        mock_update.return_value = None
+
+        with pytest.raises(HTTPException) as excinfo:
+            await employee_service.update_employee(
+                mock_db_conn,
+                uuid.UUID(mock_employee_data["uuid"]),
+                EmployeeUpdate(name="Jane Doe"),
+            )
+
+        assert excinfo.value.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_delete_employee_success(mock_db_conn, mock_employee_data):
     """Test deleting an employee successfully."""
     # Mock the repository functions
-    with (
-        patch("app.repositories.employee_repository.get_employee_by_uuid") as mock_get,
-        patch("app.repositories.employee_repository.delete_employee") as mock_delete,
-    ):
+    with patch("app.repositories.employee_repository.delete_employee") as mock_delete:
         # Set up mock return values
-        mock_get.return_value = mock_employee_data
         mock_delete.return_value = True  # Employee was deleted
 
         # Call the service function
@@ -235,5 +221,4 @@ async def test_delete_employee_success(mock_db_conn, mock_employee_data):
         await employee_service.delete_employee(mock_db_conn, employee_uuid)
 
         # Verify calls
-        mock_get.assert_called_once_with(mock_db_conn, employee_uuid)
         mock_delete.assert_called_once_with(mock_db_conn, employee_uuid)
@@ -1,12 +1,24 @@
+import asyncio
 import json
 import os
+import threading
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
+import litellm
 import pytest
-
-from app.services.llm.client import LLMClient, LLMConfig, LLMProvider
+from pydantic import ValidationError
+from tenacity import wait_none
+
+from app.services.llm.client import (
+    LLMClient,
+    LLMConfig,
+    LLMProvider,
+    close_llm_http_client,
+    open_llm_http_client,
+)
 from app.services.llm.config import LLMConfigManager
-from app.services.llm.ocr_service import OCRService
+from app.services.llm.ocr_service import OCR_RESPONSE_FORMAT, OCRService
 
 
 class TestLLMConfig:
@@ -49,6 +61,17 @@ class TestLLMConfig:
         config = LLMConfig(provider=LLMProvider.GEMINI, model="gemini-pro-vision")
         assert config.get_model_string() == "gemini/gemini-pro-vision"
 
+    def test_config_is_frozen(self):
+        """Test that configs are immutable, hashable and cache the model string."""
+        config = LLMConfig(provider=LLMProvider.GEMINI, model="gemini-pro-vision")
+        assert config.model_string is config.model_string
+        assert hash(config) == hash(
+            LLMConfig(provider=LLMProvider.GEMINI, model="gemini-pro-vision")
+        )
+
+        with pytest.raises(ValidationError):
+            config.model = "gemini-2.0-flash"
+
 
 class TestLLMConfigManager:
     """Tests for LLM configuration manager."""
@@ -96,6 +119,198 @@ class TestLLMClient:
             # Check API keys were set
             assert mock_litellm.request_timeout == client.config.request_timeout
 
+    async def test_shared_http_client(self):
+        """Test that litellm uses the shared HTTP client until it is closed."""
+        http_client = open_llm_http_client()
+        try:
+            assert litellm.aclient_session is http_client
+        finally:
+            await close_llm_http_client(http_client)
+
+        assert litellm.aclient_session is None
+        assert http_client.is_closed
+
+    async def test_completion_bounded_in_flight(self):
+        """Test that concurrent completions on one client are capped."""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def acompletion(**kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            response = MagicMock()
+            response.choices[0].message.content = '{"pages": []}'
+            return response
+
+        with (
+            patch("app.services.llm.client.LLM_MAX_IN_FLIGHT", 2),
+            patch(
+                "app.services.llm.client.litellm.acompletion", side_effect=acompletion
+            ),
+        ):
+            client = LLMClient()
+            await asyncio.gather(*(client.completion(messages=[]) for _ in range(5)))
+
+        assert max_in_flight == 2
+
+    async def test_completion_in_flight_limit_per_loop(self):
+        """Test that one client can be contended on from different event loops."""
+
+        async def acompletion(**kwargs):
+            await asyncio.sleep(0.01)
+            response = MagicMock()
+            response.choices[0].message.content = '{"pages": []}'
+            return response
+
+        async def contend(client):
+            await asyncio.gather(*(client.completion(messages=[]) for _ in range(3)))
+
+        with (
+            patch("app.services.llm.client.LLM_MAX_IN_FLIGHT", 1),
+            patch(
+                "app.services.llm.client.litellm.acompletion", side_effect=acompletion
+            ),
+        ):
+            client = LLMClient()
+            await contend(client)
+            # A semaphore shared across loops would raise RuntimeError here
+            await asyncio.to_thread(asyncio.run, contend(client))
+
+    async def test_completion_anthropic_prompt_cache(self):
+        """Test that the static prompt prefix is marked for Anthropic caching."""
+        with patch("app.services.llm.client.litellm") as mock_litellm:
+            response = MagicMock()
+            response.choices[0].message.content = '{"pages": []}'
+            mock_litellm.acompletion = AsyncMock(return_value=response)
+
+            client = LLMClient()
+            messages = [
+                {"role": "system", "content": "system prompt"},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "user prompt"},
+                        {"type": "image_url", "image_url": {"url": "data:"}},
+                    ],
+                },
+            ]
+            config = LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude")
+
+            await client.completion(
+                messages=messages, config=config, prompt_cache_key="/ocr/pdf"
+            )
+
+            sent = mock_litellm.acompletion.call_args.kwargs["messages"]
+            assert sent[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+            assert "cache_control" not in sent[1]["content"][1]
+            assert "cache_control" not in sent[0]["content"][0]
+            # The caller's messages are not mutated
+            assert messages[1]["content"][0] == {"type": "text", "text": "user prompt"}
+
+    async def test_completion_retries_transient_errors(self):
+        """Test that transient errors are retried up to the config's max_retries."""
+        response = MagicMock()
+        response.choices[0].message.content = '{"pages": []}'
+        client = LLMClient(LLMConfig(max_retries=3))
+        client._retrying = client._retrying.copy(wait=wait_none())
+
+        with patch(
+            "app.services.llm.client.litellm.acompletion",
+            AsyncMock(side_effect=[httpx.ConnectError("boom"), response]),
+        ) as mock_acompletion:
+            assert await client.completion(messages=[]) == {"pages": []}
+            assert mock_acompletion.call_count == 2
+
+        with patch(
+            "app.services.llm.client.litellm.acompletion",
+            AsyncMock(side_effect=httpx.ConnectError("boom")),
+        ) as mock_acompletion:
+            with pytest.raises(httpx.ConnectError):
+                await client.completion(messages=[], config=LLMConfig(max_retries=2))
+            assert mock_acompletion.call_count == 2
+
+        rate_limited = litellm.exceptions.RateLimitError(
+            message="slow down", llm_provider="openai", model="gpt-4o"
+        )
+        with patch(
+            "app.services.llm.client.litellm.acompletion",
+            AsyncMock(side_effect=[rate_limited, response]),
+        ) as mock_acompletion:
+            assert await client.completion(messages=[]) == {"pages": []}
+            assert mock_acompletion.call_count == 2
+
+    async def test_completion_does_not_retry_permanent_errors(self):
+        """Test that client errors such as bad requests are raised immediately."""
+        client = LLMClient(LLMConfig(max_retries=3))
+        client._retrying = client._retrying.copy(wait=wait_none())
+        bad_request = litellm.exceptions.BadRequestError(
+            message="invalid prompt", llm_provider="openai", model="gpt-4o"
+        )
+
+        with patch(
+            "app.services.llm.client.litellm.acompletion",
+            AsyncMock(side_effect=bad_request),
+        ) as mock_acompletion:
+            with pytest.raises(litellm.exceptions.BadRequestError):
+                await client.completion(messages=[])
+            assert mock_acompletion.call_count == 1
+
+        status_error = httpx.HTTPStatusError(
+            "unauthorized",
+            request=httpx.Request("POST", "https://example.com"),
+            response=httpx.Response(401),
+        )
+        with patch(
+            "app.services.llm.client.litellm.acompletion",
+            AsyncMock(side_effect=status_error),
+        ) as mock_acompletion:
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.completion(messages=[])
+            assert mock_acompletion.call_count == 1
+
+    async def test_completion_openai_prompt_cache_key(self):
+        """Test that the prompt cache key is forwarded to OpenAI."""
+        with patch("app.services.llm.client.litellm") as mock_litellm:
+            response = MagicMock()
+            response.choices[0].message.content = '{"pages": []}'
+            mock_litellm.acompletion = AsyncMock(return_value=response)
+
+            client = LLMClient()
+            config = LLMConfig(provider=LLMProvider.OPENAI, model="gpt-4o")
+
+            await client.completion(
+                messages=[{"role": "user", "content": "hi"}],
+                config=config,
+                prompt_cache_key="/ocr/pdf",
+            )
+
+            call_kwargs = mock_litellm.acompletion.call_args.kwargs
+            assert call_kwargs["prompt_cache_key"] == "/ocr/pdf"
+            assert call_kwargs["messages"] == [{"role": "user", "content": "hi"}]
+
+    async def test_parse_llm_response(self):
+        """Test parsing plain, wrapped and invalid JSON responses."""
+        with patch("app.services.llm.client.litellm"):
+            client = LLMClient()
+
+        assert client._parse_llm_response('{"pages": []}') == {"pages": []}
+        wrapped = 'Here you go:\n```json\n{"pages": [{"page_number": 1}]}\n```'
+        assert client._parse_llm_response(wrapped) == {"pages": [{"page_number": 1}]}
+        assert "error" in client._parse_llm_response("not json")
+        trailing = 'Result: {"note": "braces } in { strings"} and a stray }'
+        assert client._parse_llm_response(trailing) == {"note": "braces } in { strings"}
+        assert "error" in client._parse_llm_response('Truncated: {"pages": [')
+        fenced_after_prose = (
+            "Fields are {name, staff_code}:\n```json\n"
+            '{"pages": [{"page_number": 2}]}\n```'
+        )
+        assert client._parse_llm_response(fenced_after_prose) == {
+            "pages": [{"page_number": 2}]
+        }
+
 
 @pytest.mark.asyncio
 class TestOCRService:
@@ -106,18 +321,24 @@ class TestOCRService:
         # Create a mock LLM client
         mock_client = MagicMock()
         mock_client.completion = AsyncMock(
-            return_value={
-                "pages": [
-                    {
-                        "page_number": 1,
-                        "data": {"title": "Test Document", "date": "2023-01-01"},
-                    },
-                    {
-                        "page_number": 2,
-                        "data": {"author": "John Doe", "signature": True},
-                    },
-                ]
-            }
+            side_effect=[
+                {
+                    "pages": [
+                        {
+                            "page_number": 1,
+                            "data": {"title": "Test Document", "date": "2023-01-01"},
+                        }
+                    ]
+                },
+                {
+                    "pages": [
+                        {
+                            "page_number": 1,
+                            "data": {"author": "John Doe", "signature": True},
+                        }
+                    ]
+                },
+            ]
         )
 
         # Create the service with the mock client
@@ -144,15 +365,17 @@ class TestOCRService:
         assert "data" in results[0]
         assert results[0]["data"]["title"] == "Test Document"
         assert results[1]["page_number"] == 2
+        assert results[1]["data"]["author"] == "John Doe"
 
-        # Verify the client was called correctly
-        mock_client.completion.assert_called_once()
+        # Verify the client was called once per page
+        assert mock_client.completion.call_count == 2
         # Get the call arguments
         call_args = mock_client.completion.call_args[1]
         assert "messages" in call_args
         assert "config" in call_args
         assert call_args["config"] == mock_get_config.return_value
-        assert call_args["response_format"] == {"type": "json_object"}
+        assert call_args["response_format"] == OCR_RESPONSE_FORMAT
+        assert call_args["response_format"] is not OCR_RESPONSE_FORMAT
 
     async def test_process_document_error(self):
         """Test error handling in the OCR service."""
@@ -175,3 +398,161 @@ class TestOCRService:
         assert len(results) == 1
         assert isinstance(results[0]["data"], dict)
         assert results[0]["data"] == {}
+
+    async def test_process_document_config_override(self):
+        """Test that an explicit config bypasses the route configuration."""
+        mock_client = MagicMock()
+        mock_client.completion = AsyncMock(return_value={"pages": []})
+        service = OCRService(mock_client)
+        override = LLMConfig(provider=LLMProvider.ANTHROPIC, model="claude")
+
+        with patch(
+            "app.services.llm.ocr_service.config_manager.get_config"
+        ) as mock_get_config:
+            await service.process_document(
+                pdf_pages=[b"pdf_page1"], route_path="/ocr/pdf", llm_config=override
+            )
+
+        mock_get_config.assert_not_called()
+        assert mock_client.completion.call_args.kwargs["config"] is override
+
+    async def test_process_document_bounded_concurrency(self):
+        """Test that pages are processed concurrently up to the limit."""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def completion(**kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"pages": [{"page_number": 1, "data": {}}]}
+
+        mock_client = MagicMock()
+        mock_client.completion = completion
+        service = OCRService(mock_client)
+
+        with (
+            patch("app.services.llm.ocr_service.MAX_OCR_CONCURRENCY", 2),
+            patch("app.services.llm.ocr_service.config_manager.get_config"),
+        ):
+            results = await service.process_document(
+                pdf_pages=[b"page%d" % i for i in range(5)]
+            )
+
+        assert [result["page_number"] for result in results] == [1, 2, 3, 4, 5]
+        assert max_in_flight == 2
+
+    async def test_process_document_page_error(self):
+        """Test that a failed page does not discard the other pages."""
+        mock_client = MagicMock()
+        mock_client.completion = AsyncMock(
+            side_effect=[
+                {"pages": [{"page_number": 1, "data": {"name": "Jane"}}]},
+                Exception("API error"),
+            ]
+        )
+        service = OCRService(mock_client)
+
+        with patch("app.services.llm.ocr_service.config_manager.get_config"):
+            results = await service.process_document(pdf_pages=[b"p1", b"p2"])
+
+        assert results == [
+            {"page_number": 1, "data": {"name": "Jane"}},
+            {"page_number": 2, "data": {}},
+        ]
+
+    async def test_process_document_large_page_encoded_off_loop(self):
+        """Test that large pages are base64-encoded in a worker thread."""
+        mock_client = MagicMock()
+        mock_client.completion = AsyncMock(return_value={"pages": []})
+        service = OCRService(mock_client)
+        encode_threads = {}
+        create_pdf_messages = service._create_pdf_messages
+
+        def record_thread(pdf_pages):
+            encode_threads[pdf_pages[0]] = threading.get_ident()
+            return create_pdf_messages(pdf_pages)
+
+        with (
+            patch("app.services.llm.ocr_service.BASE64_OFFLOAD_THRESHOLD", 4),
+            patch("app.services.llm.ocr_service.config_manager.get_config"),
+            patch.object(service, "_create_pdf_messages", side_effect=record_thread),
+        ):
+            await service.process_document(pdf_pages=[b"p1", b"large"])
+
+        assert encode_threads[b"p1"] == threading.get_ident()
+        assert encode_threads[b"large"] != threading.get_ident()
+
+    async def test_process_document_duplicate_pages(self):
+        """Test that identical pages are sent to the LLM only once."""
+        mock_client = MagicMock()
+        mock_client.completion = AsyncMock(
+            side_effect=[
+                {"pages": [{"page_number": 1, "data": {"name": "Jane"}}]},
+                {"pages": [{"page_number": 1, "data": {"name": "John"}}]},
+            ]
+        )
+        service = OCRService(mock_client)
+
+        with patch("app.services.llm.ocr_service.config_manager.get_config"):
+            results = await service.process_document(pdf_pages=[b"p1", b"p2", b"p1"])
+
+        assert results == [
+            {"page_number": 1, "data": {"name": "Jane"}},
+            {"page_number": 2, "data": {"name": "John"}},
+            {"page_number": 3, "data": {"name": "Jane"}},
+        ]
+        assert mock_client.completion.call_count == 2
+        assert results[0]["data"] is not results[2]["data"]
+
+    async def test_process_whole_document(self):
+        """Test that a whole document is sent in one request."""
+        mock_client = MagicMock()
+        mock_client.completion = AsyncMock(
+            return_value={
+                "pages": [
+                    {"page_number": 1, "data": {"name": "Jane"}},
+                    {"page_number": 2, "data": {"name": "John"}},
+                ]
+            }
+        )
+        service = OCRService(mock_client)
+
+        with patch("app.services.llm.ocr_service.config_manager.get_config"):
+            results = await service.process_whole_document(b"document")
+
+        assert results == [
+            {"page_number": 1, "data": {"name": "Jane"}},
+            {"page_number": 2, "data": {"name": "John"}},
+        ]
+        mock_client.completion.assert_called_once()
+
+        mock_client.completion.side_effect = Exception("API error")
+        with patch("app.services.llm.ocr_service.config_manager.get_config"):
+            results = await service.process_whole_document(b"document")
+
+        assert results == [{"page_number": 1, "data": {}}]
+
+    async def test_format_results(self):
+        """Test that page results are normalized and malformed entries dropped."""
+        service = OCRService(MagicMock())
+
+        results = service._format_results(
+            {
+                "pages": [
+                    {"page_number": 3, "data": {"name": "Jane"}, "explanation": "x"},
+                    "not a page",
+                    {"data": ["not", "a", "dict"]},
+                ]
+            }
+        )
+
+        assert results == [
+            {"page_number": 3, "data": {"name": "Jane"}},
+            {"page_number": 3, "data": {}},
+        ]
+        assert service._format_results({"error": "bad"}) == [
+            {"page_number": 1, "data": {}}
+        ]
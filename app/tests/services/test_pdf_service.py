@@ -1,12 +1,16 @@
 import io
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
+from pypdf import PdfReader, PdfWriter
 
 from app.main import app
-from app.services.pdf_service import PDFProcessingError, process_pdf, validate_pdf
+from app.services.pdf_pages import prepare_pdf_pages, validate_pdf
+from app.services.pdf_service import PDFProcessingError, process_pdf
 
 
 @pytest.fixture
@@ -28,7 +32,7 @@ def mock_pdf_file():
 async def test_validate_pdf_valid(mock_pdf_file):
     """Test validate_pdf with a valid PDF."""
     # This uses the mock PDF file from the fixture
-    with patch("app.services.pdf_service.PdfReader") as mock_reader:
+    with patch("app.services.pdf_pages.PdfReader") as mock_reader:
         # Mock the PdfReader to return valid PDF data
         mock_instance = MagicMock()
         mock_instance.pages = [MagicMock()]  # Mock having one page
@@ -44,7 +48,7 @@ async def test_validate_pdf_invalid():
     # Create an invalid file
     invalid_file = io.BytesIO(b"This is not a PDF file")
 
-    with patch("app.services.pdf_service.PdfReader") as mock_reader:
+    with patch("app.services.pdf_pages.PdfReader") as mock_reader:
         # Mock the PdfReader to raise an exception
         mock_reader.side_effect = Exception("Invalid PDF")
 
@@ -52,20 +56,34 @@ async def test_validate_pdf_invalid():
             validate_pdf(invalid_file)
 
 
+def test_prepare_pdf_pages_splits_pages():
+    """Test that a multi-page PDF is split into single-page PDFs."""
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=72, height=72)
+    pdf_file = io.BytesIO()
+    writer.write(pdf_file)
+
+    pages = prepare_pdf_pages(pdf_file)
+
+    assert len(pages) == 3
+    assert all(len(PdfReader(io.BytesIO(page)).pages) == 1 for page in pages)
+
+
 @pytest.mark.asyncio
 async def test_process_pdf_success(mock_pdf_file):
     """Test successful PDF processing."""
     # Mock the necessary functions
     with (
-        patch("app.services.pdf_service.validate_pdf") as mock_validate,
-        patch("app.services.pdf_service.split_pdf") as mock_split,
+        patch("app.services.pdf_pages.PdfReader") as mock_reader,
+        patch("app.services.pdf_pages._split_pages") as mock_split,
         patch(
             "app.services.llm.ocr_service.default_ocr_service.process_document"
         ) as mock_ocr,
     ):
 
         # Configure mocks
-        mock_validate.return_value = True
+        mock_reader.return_value.pages = [MagicMock(), MagicMock()]
         mock_split.return_value = [b"page1", b"page2"]
 
         # Mock the OCR result
@@ -91,63 +109,63 @@ async def test_process_pdf_success(mock_pdf_file):
         assert result[1]["page_number"] == 2
         assert result[1]["data"]["author"] == "John Doe"
 
-        # Verify the function calls
-        mock_validate.assert_called_once_with(mock_pdf_file)
-        mock_split.assert_called_once_with(mock_pdf_file)
+        # Verify the file is parsed once and split from the same reader
+        mock_reader.assert_called_once_with(mock_pdf_file)
+        mock_split.assert_called_once_with(mock_reader.return_value)
         mock_ocr.assert_called_once_with(
-            pdf_pages=[b"page1", b"page2"], route_path="/ocr/pdf"
+            pdf_pages=[b"page1", b"page2"], route_path="/ocr/pdf", llm_config=None
         )
 
 
 @pytest.mark.asyncio
 async def test_process_pdf_validation_error(mock_pdf_file):
     """Test PDF processing with validation error."""
-    with patch("app.services.pdf_service.validate_pdf") as mock_validate:
-        # Configure mock to return False
-        mock_validate.return_value = False
+    with patch("app.services.pdf_pages.PdfReader") as mock_reader:
+        # Configure mock to have no pages
+        mock_reader.return_value.pages = []
 
         # Call the function and check for exception
-        with pytest.raises(PDFProcessingError):
+        with pytest.raises(PDFProcessingError, match="Invalid PDF file"):
             await process_pdf(mock_pdf_file)
 
         # Verify the function call
-        mock_validate.assert_called_once_with(mock_pdf_file)
+        mock_reader.assert_called_once_with(mock_pdf_file)
 
 
 @pytest.mark.asyncio
 async def test_process_pdf_splitting_error(mock_pdf_file):
     """Test PDF processing with splitting error."""
     with (
-        patch("app.services.pdf_service.validate_pdf") as mock_validate,
-        patch("app.services.pdf_service.split_pdf") as mock_split,
+        patch("app.services.pdf_pages.PdfReader") as mock_reader,
+        patch("app.services.pdf_pages._split_pages") as mock_split,
     ):
 
         # Configure mocks
-        mock_validate.return_value = True
-        mock_split.side_effect = Exception("Error splitting PDF")
+        mock_reader.return_value.pages = [MagicMock()]
+        mock_split.side_effect = Exception("bad page")
 
         # Call the function and check for exception
-        with pytest.raises(PDFProcessingError):
+        with pytest.raises(PDFProcessingError, match="Error splitting PDF"):
             await process_pdf(mock_pdf_file)
 
         # Verify the function calls
-        mock_validate.assert_called_once_with(mock_pdf_file)
-        mock_split.assert_called_once_with(mock_pdf_file)
+        mock_reader.assert_called_once_with(mock_pdf_file)
+        mock_split.assert_called_once_with(mock_reader.return_value)
 
 
 @pytest.mark.asyncio
 async def test_process_pdf_ocr_error(mock_pdf_file):
     """Test PDF processing with OCR error."""
     with (
-        patch("app.services.pdf_service.validate_pdf") as mock_validate,
-        patch("app.services.pdf_service.split_pdf") as mock_split,
+        patch("app.services.pdf_pages.PdfReader") as mock_reader,
+        patch("app.services.pdf_pages._split_pages") as mock_split,
         patch(
             "app.services.llm.ocr_service.default_ocr_service.process_document"
         ) as mock_ocr,
     ):
 
         # Configure mocks
-        mock_validate.return_value = True
+        mock_reader.return_value.pages = [MagicMock(), MagicMock()]
         mock_split.return_value = [b"page1", b"page2"]
         mock_ocr.side_effect = Exception("OCR error")
 
@@ -156,6 +174,76 @@ async def test_process_pdf_ocr_error(mock_pdf_file):
             await process_pdf(mock_pdf_file)
 
         # Verify the function calls
-        mock_validate.assert_called_once_with(mock_pdf_file)
-        mock_split.assert_called_once_with(mock_pdf_file)
+        mock_reader.assert_called_once_with(mock_pdf_file)
+        mock_split.assert_called_once_with(mock_reader.return_value)
         mock_ocr.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_whole_document(mock_pdf_file):
+    """Test that the unsplit PDF is sent in one request when splitting is off."""
+    with (
+        patch("app.services.pdf_service.prepare_pdf_pages") as mock_prepare,
+        patch("app.services.pdf_service.validate_pdf", return_value=True),
+        patch(
+            "app.services.llm.ocr_service.default_ocr_service.process_whole_document"
+        ) as mock_ocr,
+    ):
+        mock_ocr.return_value = [{"page_number": 1, "data": {}}]
+
+        result = await process_pdf(mock_pdf_file, split_pages=False)
+
+        assert result == [{"page_number": 1, "data": {}}]
+        mock_prepare.assert_not_called()
+        mock_ocr.assert_called_once_with(
+            pdf_document=mock_pdf_file.getvalue(),
+            route_path="/ocr/pdf",
+            llm_config=None,
+        )
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_with_executor(mock_pdf_file):
+    """Test that PDF parsing is dispatched to the executor when provided."""
+    with (
+        patch("app.services.pdf_service.prepare_pdf_bytes") as mock_prepare,
+        patch(
+            "app.services.llm.ocr_service.default_ocr_service.process_document"
+        ) as mock_ocr,
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        # Configure mocks
+        mock_prepare.return_value = [b"page1"]
+        mock_ocr.return_value = [{"page_number": 1, "data": {}}]
+
+        # Call the function
+        result = await process_pdf(mock_pdf_file, executor=executor)
+
+        # The worker receives raw bytes rather than the file handle
+        assert result == [{"page_number": 1, "data": {}}]
+        mock_prepare.assert_called_once_with(mock_pdf_file.getvalue())
+        mock_ocr.assert_called_once_with(
+            pdf_pages=[b"page1"], route_path="/ocr/pdf", llm_config=None
+        )
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_without_executor_parses_off_loop(mock_pdf_file):
+    """Test that PDF parsing runs in a worker thread when no pool is given."""
+    parse_threads = []
+
+    def prepare(file):
+        parse_threads.append(threading.get_ident())
+        return [b"page1"]
+
+    with (
+        patch("app.services.pdf_service.prepare_pdf_pages", side_effect=prepare),
+        patch(
+            "app.services.llm.ocr_service.default_ocr_service.process_document"
+        ) as mock_ocr,
+    ):
+        mock_ocr.return_value = [{"page_number": 1, "data": {}}]
+
+        await process_pdf(mock_pdf_file)
+
+    assert parse_threads and parse_threads[0] != threading.get_ident()
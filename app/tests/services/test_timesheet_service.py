@@ -1,6 +1,7 @@
 import uuid
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import patch
 
+import aiosqlite
 import pytest
 from fastapi import HTTPException
 
@@ -8,17 +9,6 @@ from app.services import timesheet_service
 from app.schemas.timesheet import TimesheetCreate, TimesheetUpdate
 
 
-@pytest.fixture
-def mock_db_conn():
-    """Mock database connection."""
-    conn = AsyncMock()
-    # Configure the mock to handle the dict conversion properly
-    cursor_mock = AsyncMock()
-    cursor_mock.fetchone.return_value = None
-    conn.execute.return_value.__aenter__.return_value = cursor_mock
-    return conn
-
-
 @pytest.fixture
 def mock_employee_uuid():
     """Mock employee UUID."""
@@ -45,20 +35,11 @@ async def test_get_employee_timesheets(mock_db_conn, mock_employee_uuid):
     """Test getting all timesheets for an employee."""
     # Mock the repository functions directly
     with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
         patch(
             "app.repositories.timesheet_repository.get_timesheets_by_employee"
         ) as mock_get_timesheets,
     ):
-        # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
-
         mock_timesheets = [
             {
                 "id": 1,
@@ -90,12 +71,33 @@ async def test_get_employee_timesheets(mock_db_conn, mock_employee_uuid):
 
         # Verify result
         assert result == mock_timesheets
-        mock_get_employee_by_uuid.assert_called_once_with(
-            mock_db_conn, mock_employee_uuid
-        )
+        # Timesheets were found, so the employee needs no separate check
+        mock_exists.assert_not_called()
         mock_get_timesheets.assert_called_once_with(mock_db_conn, mock_employee_uuid)
 
 
+@pytest.mark.asyncio
+async def test_iter_employee_timesheets_employee_not_found(
+    mock_db_conn, mock_employee_uuid
+):
+    """Test that a missing employee is reported before any timesheet is streamed."""
+    with (
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
+        patch(
+            "app.repositories.timesheet_repository.iter_timesheets_by_employee"
+        ) as mock_iter,
+    ):
+        mock_exists.return_value = False
+
+        with pytest.raises(HTTPException) as excinfo:
+            await timesheet_service.iter_employee_timesheets(
+                mock_db_conn, mock_employee_uuid
+            )
+
+        assert excinfo.value.status_code == 404
+        mock_iter.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_get_employee_timesheet_success(
     mock_db_conn, mock_employee_uuid, mock_timesheet_data
@@ -103,19 +105,12 @@ async def test_get_employee_timesheet_success(
     """Test getting a specific timesheet successfully."""
     # Mock the repository functions
     with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
         patch(
             "app.repositories.timesheet_repository.get_timesheet"
         ) as mock_get_timesheet,
     ):
         # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
         mock_get_timesheet.return_value = mock_timesheet_data
 
         # Call the service function
@@ -127,9 +122,7 @@ async def test_get_employee_timesheet_success(
 
         # Verify result
         assert result == mock_timesheet_data
-        mock_get_employee_by_uuid.assert_called_once_with(
-            mock_db_conn, mock_employee_uuid
-        )
+        mock_exists.assert_not_called()
         mock_get_timesheet.assert_called_once_with(
             mock_db_conn, mock_employee_uuid, year, month
         )
@@ -140,19 +133,13 @@ async def test_get_employee_timesheet_not_found(mock_db_conn, mock_employee_uuid
     """Test getting a non-existent timesheet."""
     # Mock the repository functions
     with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
         patch(
             "app.repositories.timesheet_repository.get_timesheet"
         ) as mock_get_timesheet,
     ):
         # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
+        mock_exists.return_value = True
         mock_get_timesheet.return_value = None
 
         # Call the service function and expect exception
@@ -164,7 +151,8 @@ async def test_get_employee_timesheet_not_found(mock_db_conn, mock_employee_uuid
 
         # Verify exception
         assert excinfo.value.status_code == 404
-        assert "not found" in str(excinfo.value.detail)
+        assert "Timesheet" in str(excinfo.value.detail)
+        mock_exists.assert_called_once_with(mock_db_conn, mock_employee_uuid)
 
 
 @pytest.mark.asyncio
@@ -173,20 +161,12 @@ async def test_create_employee_timesheet_success(mock_db_conn, mock_employee_uui
     # Mock the repository functions
     with (
         patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
-        patch(
-            "app.repositories.timesheet_repository.get_timesheet"
-        ) as mock_get_timesheet,
+            "app.repositories.employee_repository.employee_exists"
+        ) as mock_employee_exists,
         patch("app.repositories.timesheet_repository.create_timesheet") as mock_create,
     ):
         # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
-        mock_get_timesheet.return_value = None  # No existing timesheet for this month
+        mock_employee_exists.return_value = True
 
         created_timesheet = {
             "id": 1,
@@ -217,12 +197,7 @@ async def test_create_employee_timesheet_success(mock_db_conn, mock_employee_uui
 
         # Verify result
         assert result == created_timesheet
-        mock_get_employee_by_uuid.assert_called_once_with(
-            mock_db_conn, mock_employee_uuid
-        )
-        mock_get_timesheet.assert_called_once_with(
-            mock_db_conn, mock_employee_uuid, 2025, 6
-        )
+        mock_employee_exists.assert_not_called()
         mock_create.assert_called_once_with(
             mock_db_conn, mock_employee_uuid, timesheet_data
         )
@@ -236,19 +211,13 @@ async def test_create_employee_timesheet_duplicate(
     # Mock the repository functions
     with (
         patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
-        patch(
-            "app.repositories.timesheet_repository.get_timesheet"
-        ) as mock_get_timesheet,
+            "app.repositories.employee_repository.employee_exists"
+        ) as mock_employee_exists,
+        patch("app.repositories.timesheet_repository.create_timesheet") as mock_create,
     ):
         # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
-        mock_get_timesheet.return_value = mock_timesheet_data  # Existing timesheet
+        mock_employee_exists.return_value = True
+        mock_create.return_value = None  # Insert skipped: month already exists
 
         # Create timesheet data
         timesheet_data = TimesheetCreate(
@@ -271,6 +240,112 @@ async def test_create_employee_timesheet_duplicate(
         assert "already exists" in str(excinfo.value.detail)
 
 
+@pytest.mark.asyncio
+async def test_create_employee_timesheet_integrity_error(
+    mock_db_conn, mock_employee_uuid
+):
+    """Test that a constraint failure for an existing employee is a 409."""
+    with (
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
+        patch(
+            "app.repositories.timesheet_repository.create_timesheet",
+            side_effect=aiosqlite.IntegrityError("CHECK constraint failed"),
+        ),
+    ):
+        mock_exists.return_value = True
+
+        timesheet_data = TimesheetCreate(
+            year=2025,
+            month=6,
+            total_working_days=22,
+            total_ot_hours=5.5,
+            total_sundays_worked=2,
+            total_ot_hours_on_sundays=1.0,
+        )
+
+        with pytest.raises(HTTPException) as excinfo:
+            await timesheet_service.create_employee_timesheet(
+                mock_db_conn, mock_employee_uuid, timesheet_data
+            )
+
+        assert excinfo.value.status_code == 409
+        assert isinstance(excinfo.value.__cause__, aiosqlite.IntegrityError)
+        mock_exists.assert_called_once_with(mock_db_conn, mock_employee_uuid)
+
+
+@pytest.mark.asyncio
+async def test_create_employee_timesheets_success(
+    mock_db_conn, mock_employee_uuid, mock_timesheet_data
+):
+    """Test creating several timesheets in one batch."""
+    # Mock the repository functions
+    with (
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
+        patch(
+            "app.repositories.timesheet_repository.bulk_create_timesheets"
+        ) as mock_bulk_create,
+    ):
+        # Set up mock return values
+        mock_bulk_create.return_value = [mock_timesheet_data]
+
+        # Create timesheet data for a single month
+        timesheet_data = TimesheetCreate(
+            year=2025,
+            month=6,
+            total_working_days=22,
+            total_ot_hours=5.5,
+            total_sundays_worked=2,
+            total_ot_hours_on_sundays=1.0,
+        )
+
+        # Call the service function
+        result = await timesheet_service.create_employee_timesheets(
+            mock_db_conn, mock_employee_uuid, [timesheet_data]
+        )
+
+        # The created rows come straight from the batch insert
+        assert result == [mock_timesheet_data]
+        mock_bulk_create.assert_called_once_with(
+            mock_db_conn, mock_employee_uuid, [timesheet_data]
+        )
+        mock_exists.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_employee_timesheets_duplicate(mock_db_conn, mock_employee_uuid):
+    """Test creating a batch containing an existing timesheet."""
+    # Mock the repository functions
+    with (
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
+        patch(
+            "app.repositories.timesheet_repository.bulk_create_timesheets",
+            side_effect=aiosqlite.IntegrityError("UNIQUE constraint failed"),
+        ),
+    ):
+        # Set up mock return values
+        mock_exists.return_value = True
+
+        timesheet_data = TimesheetCreate(
+            year=2025,
+            month=6,
+            total_working_days=22,
+            total_ot_hours=5.5,
+            total_sundays_worked=2,
+            total_ot_hours_on_sundays=1.0,
+        )
+
+        # Call the service function and expect exception
+        with pytest.raises(HTTPException) as excinfo:
+            await timesheet_service.create_employee_timesheets(
+                mock_db_conn, mock_employee_uuid, [timesheet_data]
+            )
+
+        # Verify exception and that the partial batch was rolled back
+        assert excinfo.value.status_code == 409
+        assert "already exist" in str(excinfo.value.detail)
+        mock_db_conn.rollback.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 async def test_update_employee_timesheet_success(
     mock_db_conn, mock_employee_uuid, mock_timesheet_data
@@ -278,22 +353,13 @@ async def test_update_employee_timesheet_success(
     """Test updating a timesheet successfully."""
     # Mock the repository functions
     with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
         patch(
             "app.repositories.timesheet_repository.get_timesheet"
         ) as mock_get_timesheet,
         patch("app.repositories.timesheet_repository.update_timesheet") as mock_update,
     ):
         # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
-        mock_get_timesheet.return_value = mock_timesheet_data
-
         updated_timesheet = {
             "id": mock_timesheet_data["id"],
             "employee_uuid": str(mock_employee_uuid),
@@ -320,11 +386,9 @@ async def test_update_employee_timesheet_success(
 
         # Verify result
         assert result == updated_timesheet
-        # The employee repository is called twice - once directly and once via get_employee_timesheet
-        assert mock_get_employee_by_uuid.call_count == 2
-        mock_get_timesheet.assert_called_once_with(
-            mock_db_conn, mock_employee_uuid, year, month
-        )
+        # RETURNING reports a missing timesheet, so no SELECT is issued first
+        mock_exists.assert_not_called()
+        mock_get_timesheet.assert_not_called()
         mock_update.assert_called_once_with(
             mock_db_conn, mock_employee_uuid, year, month, update_data
         )
@@ -337,21 +401,13 @@ async def test_delete_employee_timesheet_success(
     """Test deleting a timesheet successfully."""
     # Mock the repository functions
     with (
-        patch(
-            "app.repositories.employee_repository.get_employee_by_uuid"
-        ) as mock_get_employee_by_uuid,
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
         patch(
             "app.repositories.timesheet_repository.get_timesheet"
         ) as mock_get_timesheet,
         patch("app.repositories.timesheet_repository.delete_timesheet") as mock_delete,
     ):
         # Set up mock return values
-        mock_get_employee_by_uuid.return_value = {
-            "uuid": str(mock_employee_uuid),
-            "staff_code": "EMP001",
-            "name": "John Doe",
-        }
-        mock_get_timesheet.return_value = mock_timesheet_data
         mock_delete.return_value = True
 
         # Call the service function
@@ -361,12 +417,30 @@ async def test_delete_employee_timesheet_success(
             mock_db_conn, mock_employee_uuid, year, month
         )
 
-        # Verify calls
-        # The employee repository is called twice - once directly and once via get_employee_timesheet
-        assert mock_get_employee_by_uuid.call_count == 2
-        mock_get_timesheet.assert_called_once_with(
-            mock_db_conn, mock_employee_uuid, year, month
-        )
+        # Verify calls; a successful delete needs no lookups first
+        mock_exists.assert_not_called()
+        mock_get_timesheet.assert_not_called()
         mock_delete.assert_called_once_with(
             mock_db_conn, mock_employee_uuid, year, month
         )
+
+
+@pytest.mark.asyncio
+async def test_delete_employee_timesheet_employee_not_found(
+    mock_db_conn, mock_employee_uuid
+):
+    """Test that deleting for a missing employee reports the employee."""
+    with (
+        patch("app.repositories.employee_repository.employee_exists") as mock_exists,
+        patch("app.repositories.timesheet_repository.delete_timesheet") as mock_delete,
+    ):
+        mock_exists.return_value = False
+        mock_delete.return_value = False
+
+        with pytest.raises(HTTPException) as excinfo:
+            await timesheet_service.delete_employee_timesheet(
+                mock_db_conn, mock_employee_uuid, 2025, 6
+            )
+
+        assert excinfo.value.status_code == 404
+        assert "Employee" in str(excinfo.value.detail)